@@ -0,0 +1,118 @@
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+CORRECT_STYLE = dict(color='#00ff00', linewidth=2, label='Correct Technique')
+WRONG_STYLE = dict(color='#ff3333', linestyle='--', linewidth=2, label='Wrong Technique')
+MATCH_STYLE = dict(colors='#aaaaaa', linewidths=0.8, alpha=0.6, label='Matched Phases')
+
+
+def _comparison_axes(title, max_frames, figsize=(12, 6)):
+    # Figures are built through the object API rather than pyplot, and the
+    # dark theme is set on the figure itself rather than through a
+    # matplotlib.style context (which swaps the process-wide rcParams), so
+    # concurrent analyses never share any global plotting state
+    fig = Figure(figsize=figsize, facecolor='black', edgecolor='black')
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(facecolor='black')
+    for spine in ax.spines.values():
+        spine.set_edgecolor('white')
+    ax.tick_params(colors='white')
+    ax.set_xlim(0, max_frames)
+    ax.set_ylim(0, 180)
+    ax.set_xlabel('Frame Number', color='white')
+    ax.set_ylabel('Arm Angle (degrees)', color='white')
+    ax.set_title(title, color='white', fontsize=14)
+    ax.grid(True, color='white', alpha=0.3)
+    return fig, canvas, ax
+
+
+def _legend(ax):
+    return ax.legend(facecolor='black', labelcolor='white')
+
+
+class AngleComparisonRenderer:
+    """
+    Renders the arm angle comparison animation frame by frame.
+
+    A single figure is reused for the whole animation. The static parts (axes,
+    grid, labels, title) are drawn once and cached as a background; every frame
+    restores that background, updates the line data and redraws only the two
+    lines and the legend (blitting). Frames are read straight from the Agg
+    canvas buffer, so nothing is written to disk.
+    """
+
+    def __init__(self, correct_angles, wrong_angles, similarity_percentage, figsize=(12, 6)):
+        self.correct_angles = np.asarray(correct_angles, dtype=np.float64)
+        self.wrong_angles = np.asarray(wrong_angles, dtype=np.float64)
+        self.max_frames = max(len(self.correct_angles), len(self.wrong_angles))
+
+        self.fig, self.canvas, self.ax = _comparison_axes(
+            f'Arm Angle Comparison\nSimilarity: {similarity_percentage:.2f}%', self.max_frames, figsize)
+        self.correct_line, = self.ax.plot([], [], animated=True, **CORRECT_STYLE)
+        self.wrong_line, = self.ax.plot([], [], animated=True, **WRONG_STYLE)
+        self.legend = _legend(self.ax)
+        self.legend.set_animated(True)
+
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+        self._times = np.arange(self.max_frames)
+
+    def __len__(self):
+        return self.max_frames
+
+    def render(self, frame):
+        """
+        Draw the animation state at ``frame`` and return it as an RGB array.
+
+        The returned array is a view of the canvas buffer and is overwritten by
+        the next call.
+        """
+        self.canvas.restore_region(self.background)
+
+        for line, angles in ((self.correct_line, self.correct_angles), (self.wrong_line, self.wrong_angles)):
+            # A series is only shown while it still has data for this frame
+            if frame < len(angles):
+                line.set_data(self._times[:frame + 1], angles[:frame + 1])
+                self.ax.draw_artist(line)
+
+        self.ax.draw_artist(self.legend)
+        return np.asarray(self.canvas.buffer_rgba())[..., :3]
+
+    def frames(self):
+        """Yield every animation frame as an RGB array."""
+        for frame in range(self.max_frames):
+            yield self.render(frame)
+
+
+def save_final_graph(correct_angles, wrong_angles, similarity_percentage, output_path, figsize=(12, 6),
+                     path=None, max_matches=40):
+    """
+    Save the full angle comparison graph as an image.
+
+    When an alignment ``path`` of matched (correct, wrong) frame pairs is
+    given, up to ``max_matches`` evenly spaced pairs are connected so the
+    matching phases of the two movements can be seen.
+    """
+    max_frames = max(len(correct_angles), len(wrong_angles))
+
+    fig, _, ax = _comparison_axes(
+        f'Final Arm Angle Comparison\nSimilarity: {similarity_percentage:.2f}%', max_frames, figsize)
+    if path is not None and len(path):
+        path = np.asarray(path)
+        matches = path[np.unique(np.linspace(0, len(path) - 1, max_matches).astype(int))]
+        correct, wrong = np.asarray(correct_angles), np.asarray(wrong_angles)
+        segments = np.stack([
+            np.stack([matches[:, 0], correct[matches[:, 0]]], axis=1),
+            np.stack([matches[:, 1], wrong[matches[:, 1]]], axis=1),
+        ], axis=1)
+        ax.add_collection(LineCollection(segments, **MATCH_STYLE))
+    ax.plot(np.arange(len(correct_angles)), correct_angles, **CORRECT_STYLE)
+    ax.plot(np.arange(len(wrong_angles)), wrong_angles, **WRONG_STYLE)
+    _legend(ax)
+    fig.savefig(output_path, facecolor='black', edgecolor='black')
+
+    return output_path
@@ -0,0 +1,303 @@
+"""
+Offline batch scoring of member files.
+
+Streams a CSV or Parquet file of members in chunks, scores every chunk with
+one vectorized model call per model in a pool of worker processes, and
+writes the results in input order to JSON Lines or Parquet (picked by the
+output file's extension). At most ``2 * workers`` chunks are in flight, so
+memory stays bounded however large the input is. Meal plan rows in JSON
+Lines carry every suggested nutrition record and run to tens of kilobytes,
+so keep chunks of those small.
+
+Input columns are named like the fields of the API requests:
+    meal-plan:          age, weight, height, bmi, bmr, activity_level, gender
+    exercise-intensity: actual_weight, age, gender, duration, bmi, height
+
+JSON Lines rows have the shape of the API responses. In Parquet, meal plans
+list the suggested meals as ``suggested_rows`` (row positions in
+nutrition.xlsx) and ``suggested_names`` instead of full records, and every
+exercise is a struct column. Parquet input or output requires pyarrow.
+
+Usage:
+    python batch_score.py meal-plan members.csv plans.jsonl [--meals 3] [--options 15]
+    python batch_score.py exercise-intensity members.parquet intensity.parquet [--id-column member_id]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from logs import configure_logging
+
+
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", 10000))
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", os.cpu_count() or 1))
+
+MEAL_PLAN = "meal-plan"
+EXERCISE_INTENSITY = "exercise-intensity"
+COLUMNS = {
+    MEAL_PLAN: ["age", "weight", "height", "bmi", "bmr", "activity_level", "gender"],
+    EXERCISE_INTENSITY: ["actual_weight", "age", "gender", "duration", "bmi", "height"],
+}
+FORMATS = {".jsonl": "jsonl", ".parquet": "parquet"}
+
+# Per worker process: JSON of every nutrition record and the table's meal
+# names, both built on first use
+_record_json = {}
+_meal_names = None
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Parquet input and output require pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported output file '{path}', expected one of {sorted(FORMATS)}")
+    return FORMATS[extension]
+
+
+def read_chunks(path, columns, chunk_size):
+    """
+    Yield the input file as DataFrames of up to ``chunk_size`` rows with only ``columns``.
+    """
+    if path.lower().endswith(".parquet"):
+        pyarrow = require_pyarrow()
+        import pyarrow.parquet
+
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+
+
+def score_meal_plans(chunk, number_of_meals, number_of_options, selection):
+    """
+    Returns:
+        tuple: (total calories, calories per meal, suggested row positions of
+            every distinct suggestion, index into those of every member)
+    """
+    from meal_plan_prediction import get_nutrition_index, predict_calories
+
+    index = get_nutrition_index()
+    calories = predict_calories(*(chunk[column].to_numpy() for column in COLUMNS[MEAL_PLAN]))
+    per_meal = calories / number_of_meals
+    # Members with as many meals below their budget get the same suggestions,
+    # so each distinct count is looked up (and encoded) once
+    _, first, suggestion = np.unique(index.count_below(per_meal), return_index=True, return_inverse=True)
+    suggested = [index.positions_below(limit, number_of_options, selection) for limit in per_meal[first].tolist()]
+    # Rounded like predict_meal_plan rounds its response
+    total = [round(value, 2) for value in calories.tolist()]
+    return total, [round(value, 2) for value in per_meal.tolist()], suggested, suggestion
+
+
+def score_exercises(chunk, models_dir):
+    from excercise_intensity import predict_exercise_matrix
+
+    return predict_exercise_matrix(chunk["gender"].to_numpy(), chunk["age"].to_numpy(),
+                                   chunk["actual_weight"].to_numpy(), chunk["height"].to_numpy(),
+                                   chunk["bmi"].to_numpy(), chunk["duration"].to_numpy(), models_dir=models_dir)
+
+
+def record_json(position):
+    from meal_plan_prediction import get_nutrition_index
+
+    if position not in _record_json:
+        _record_json[position] = json.dumps(get_nutrition_index().record(position)).encode()
+    return _record_json[position]
+
+
+def meal_plans_jsonl(ids, total, per_meal, suggested, suggestion):
+    meals = [b"[" + b", ".join(record_json(position) for position in positions.tolist()) + b"]" for positions in suggested]
+    lines = []
+    for i, (total_calories, calories_per_meal, j) in enumerate(zip(total, per_meal, suggestion.tolist())):
+        # The id columns go first, as a "key": value fragment
+        prefix = "{" if ids is None else "{" + json.dumps({name: values[i] for name, values in ids.items()})[1:-1] + ", "
+        lines.append(f'{prefix}"total_calories": {total_calories!r}, "calories_per_meal": {calories_per_meal!r}, '
+                     f'"suggested": '.encode())
+        lines.append(meals[j])
+        lines.append(b"}\n")
+    return b"".join(lines)
+
+
+def meal_plans_table(ids, total, per_meal, suggested, suggestion):
+    global _meal_names
+    pyarrow = require_pyarrow()
+    from meal_plan_prediction import get_nutrition_index
+
+    if _meal_names is None:
+        index = get_nutrition_index()
+        _meal_names = pyarrow.array([index.record(i)["name"] for i in range(len(index))], pyarrow.string())
+
+    suggested = [suggested[j] for j in suggestion.tolist()]
+    offsets = pyarrow.array(np.concatenate([[0], np.cumsum([len(positions) for positions in suggested])]), pyarrow.int32())
+    positions = pyarrow.array(np.concatenate(suggested + [np.empty(0, dtype=np.int64)]).astype(np.int64))
+    columns = dict(ids or {})
+    columns.update({
+        "total_calories": pyarrow.array(total, pyarrow.float64()),
+        "calories_per_meal": pyarrow.array(per_meal, pyarrow.float64()),
+        "suggested_rows": pyarrow.ListArray.from_arrays(offsets, positions),
+        "suggested_names": pyarrow.ListArray.from_arrays(offsets, _meal_names.take(positions)),
+    })
+    return pyarrow.table(columns)
+
+
+def exercises_jsonl(ids, set_counts, rep_counts, intensities):
+    from excercise_intensity import exercise_list
+
+    lines = []
+    for i, (sets, reps, rates) in enumerate(zip(set_counts.tolist(), rep_counts.tolist(), intensities.tolist())):
+        row = {} if ids is None else {name: values[i] for name, values in ids.items()}
+        for exercise, set_count, rep_count, rate in zip(exercise_list, sets, reps, rates):
+            row[exercise] = {'Set Count': set_count, 'Rep Count': rep_count, 'Intensity Rate': rate}
+        lines.append(json.dumps(row) + "\n")
+    return "".join(lines).encode()
+
+
+def exercises_table(ids, set_counts, rep_counts, intensities):
+    pyarrow = require_pyarrow()
+    from excercise_intensity import exercise_list
+
+    columns = dict(ids or {})
+    for j, exercise in enumerate(exercise_list):
+        columns[exercise] = pyarrow.StructArray.from_arrays(
+            [set_counts[:, j], rep_counts[:, j], intensities[:, j]], names=['Set Count', 'Rep Count', 'Intensity Rate'])
+    return pyarrow.table(columns)
+
+
+def score_chunk(task, chunk, id_column, output_format, options):
+    """
+    Score one chunk in a worker process.
+
+    Returns:
+        tuple: (rows, encoded JSON Lines bytes or a pyarrow Table)
+    """
+    ids = None if id_column is None else {id_column: chunk[id_column].tolist()}
+    if task == MEAL_PLAN:
+        scores = score_meal_plans(chunk, options["number_of_meals"], options["number_of_options"], options["selection"])
+        encode = meal_plans_jsonl if output_format == "jsonl" else meal_plans_table
+    else:
+        scores = score_exercises(chunk, options["models_dir"])
+        encode = exercises_jsonl if output_format == "jsonl" else exercises_table
+    return len(chunk), encode(ids, *scores)
+
+
+class ResultWriter:
+    """Appends encoded chunks to a JSON Lines file or a Parquet file."""
+
+    def __init__(self, path, output_format):
+        self.path = path
+        self.output_format = output_format
+        self._file = open(path, "wb") if output_format == "jsonl" else None
+        self._writer = None
+
+    def write(self, payload):
+        if self.output_format == "jsonl":
+            self._file.write(payload)
+            return
+        if self._writer is None:
+            require_pyarrow()
+            import pyarrow.parquet
+
+            self._writer = pyarrow.parquet.ParquetWriter(self.path, payload.schema)
+        self._writer.write_table(payload)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._writer is not None:
+            self._writer.close()
+
+
+def run(task, input_path, output_path, chunk_size=BATCH_CHUNK_SIZE, workers=BATCH_WORKERS, id_column=None, **options):
+    """
+    Score ``input_path`` into ``output_path``.
+
+    Args:
+        task (str): MEAL_PLAN or EXERCISE_INTENSITY
+        chunk_size (int): Rows per chunk
+        workers (int): Worker processes; 1 scores in this process
+        id_column (str): Input column copied to every output row, e.g. a member id
+        **options: number_of_meals, number_of_options and selection for
+            meal plans, models_dir for exercise intensity
+
+    Returns:
+        dict: ``rows`` scored, ``seconds`` taken and ``rows_per_second``
+    """
+    output_format = file_format(output_path)
+    columns = COLUMNS[task] + ([id_column] if id_column is not None else [])
+    chunks = read_chunks(input_path, columns, chunk_size)
+    writer = ResultWriter(output_path, output_format)
+    started = time.perf_counter()
+    rows = 0
+
+    def report(count):
+        nonlocal rows
+        rows += count
+        elapsed = time.perf_counter() - started
+        print(f"{rows} rows, {rows / elapsed:.0f} rows/s", flush=True)
+
+    try:
+        if workers <= 1:
+            for chunk in chunks:
+                count, payload = score_chunk(task, chunk, id_column, output_format, options)
+                writer.write(payload)
+                report(count)
+        else:
+            # spawn like the other pools: workers start clean instead of inheriting the parent's threads
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=configure_logging) as executor:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(executor.submit(score_chunk, task, chunk, id_column, output_format, options))
+                    if len(pending) >= 2 * workers:
+                        count, payload = pending.popleft().result()
+                        writer.write(payload)
+                        report(count)
+                while pending:
+                    count, payload = pending.popleft().result()
+                    writer.write(payload)
+                    report(count)
+    finally:
+        writer.close()
+
+    seconds = time.perf_counter() - started
+    return {"rows": rows, "seconds": seconds, "rows_per_second": rows / seconds if seconds else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("task", choices=sorted(COLUMNS))
+    parser.add_argument("input", help="CSV or Parquet file of members")
+    parser.add_argument("output", help=".jsonl or .parquet file to write")
+    parser.add_argument("--chunk-size", type=int, default=BATCH_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--id-column", help="Input column to copy to every output row")
+    parser.add_argument("--meals", type=int, default=3, help="Meals per day (meal-plan)")
+    parser.add_argument("--options", type=int, default=15, help="Suggested meals per member (meal-plan)")
+    parser.add_argument("--selection", choices=["first", "closest", "diverse"], default="first")
+    parser.add_argument("--models-dir", default="models/fitness", help="Exercise models (exercise-intensity)")
+    args = parser.parse_args()
+
+    if args.task == MEAL_PLAN:
+        options = {"number_of_meals": args.meals, "number_of_options": args.options, "selection": args.selection}
+    else:
+        options = {"models_dir": args.models_dir}
+    result = run(args.task, args.input, args.output, chunk_size=args.chunk_size, workers=args.workers,
+                 id_column=args.id_column, **options)
+    print(f"Scored {result['rows']} rows in {result['seconds']:.1f}s ({result['rows_per_second']:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
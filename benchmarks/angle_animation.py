@@ -0,0 +1,91 @@
+"""
+Per-frame cost of rendering the angle comparison animation.
+
+Times the incremental renderer (one reused figure, blitted line updates,
+frames read from the canvas buffer) against the previous approach of
+building a new pyplot figure per frame and saving it as a PNG. The legacy
+renderer grows quadratically, so by default it only runs on the smaller
+inputs.
+
+Usage:
+    python -m benchmarks.angle_animation [--frames 300 3000] [--legacy-max 300] [--encode]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from angle_animation import AngleComparisonRenderer
+
+
+def synthetic_angles(frames, period=90.0, phase=0.0):
+    t = np.arange(frames)
+    return 90 + 60 * np.sin(2 * np.pi * t / period + phase)
+
+
+def render_incremental(correct, wrong, encode_path=None):
+    renderer = AngleComparisonRenderer(correct, wrong, 87.5)
+    if encode_path:
+        from video_encoder import VideoEncoder
+        with VideoEncoder(encode_path, fps=15) as encoder:
+            for frame in renderer.frames():
+                encoder.write(frame)
+    else:
+        for _ in renderer.frames():
+            pass
+
+
+def render_legacy(correct, wrong, folder):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    max_frames = max(len(correct), len(wrong))
+    times_correct = list(range(len(correct)))
+    times_wrong = list(range(len(wrong)))
+    plt.style.use('dark_background')
+    for frame in range(max_frames):
+        plt.figure(figsize=(12, 6))
+        if frame < len(correct):
+            plt.plot(times_correct[:frame+1], correct[:frame+1], color='#00ff00', linewidth=2, label='Correct Technique')
+        if frame < len(wrong):
+            plt.plot(times_wrong[:frame+1], wrong[:frame+1], color='#ff3333', linestyle='--', linewidth=2, label='Wrong Technique')
+        plt.xlim(0, max_frames)
+        plt.ylim(0, 180)
+        plt.xlabel('Frame Number', color='white')
+        plt.ylabel('Arm Angle (degrees)', color='white')
+        plt.title('Arm Angle Comparison\nSimilarity: 87.50%', color='white', fontsize=14)
+        plt.grid(True, alpha=0.3)
+        plt.legend()
+        plt.savefig(os.path.join(folder, f'frame_{frame:04d}.png'), facecolor='black')
+        plt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, nargs="+", default=[300, 3000])
+    parser.add_argument("--legacy-max", type=int, default=300, help="Largest input to run the legacy renderer on")
+    parser.add_argument("--encode", action="store_true", help="Include MP4 encoding in the incremental timing")
+    args = parser.parse_args()
+
+    for frames in args.frames:
+        correct = synthetic_angles(frames)
+        wrong = synthetic_angles(int(frames * 0.9), period=80.0, phase=0.3)
+
+        with tempfile.TemporaryDirectory() as folder:
+            start = time.perf_counter()
+            render_incremental(correct, wrong, os.path.join(folder, "angles.mp4") if args.encode else None)
+            elapsed = time.perf_counter() - start
+            print(f"{frames:>6} frames  incremental: {elapsed:8.2f}s  {elapsed / frames * 1000:7.2f} ms/frame")
+
+            if frames <= args.legacy_max:
+                start = time.perf_counter()
+                render_legacy(list(correct), list(wrong), folder)
+                elapsed = time.perf_counter() - start
+                print(f"{frames:>6} frames  legacy png:  {elapsed:8.2f}s  {elapsed / frames * 1000:7.2f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Cold-start benchmark for the nutrition table.
+
+Compares loading the table the old way (``pd.read_excel`` of nutrition.xlsx)
+with opening the columnar ``.npy`` cache, each in a fresh interpreter so
+import and page-cache effects match a worker boot.
+
+Usage:
+    python -m benchmarks.cold_start [--repeat 3]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+from nutrition_store import build_cache
+
+
+EXCEL_SNIPPET = """
+import time
+start = time.perf_counter()
+import pandas as pd
+from nutrition_index import NutritionIndex
+index = NutritionIndex.from_dataframe(pd.read_excel("nutrition.xlsx"))
+index.below(500, 15)
+print(time.perf_counter() - start)
+"""
+
+CACHE_SNIPPET = """
+import time
+start = time.perf_counter()
+from nutrition_index import NutritionIndex
+from nutrition_store import open_table
+index = NutritionIndex.from_table(open_table())
+index.below(500, 15)
+print(time.perf_counter() - start)
+"""
+
+
+def time_snippet(snippet):
+    output = subprocess.run([sys.executable, "-c", snippet], check=True, capture_output=True, text=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    build_cache()
+    print(f"cache build (skipped if up to date): {time.perf_counter() - start:.3f}s")
+
+    for label, snippet in (("read_excel", EXCEL_SNIPPET), ("npy cache", CACHE_SNIPPET)):
+        timings = [time_snippet(snippet) for _ in range(args.repeat)]
+        print(f"{label:>10}: best {min(timings):.3f}s, mean {sum(timings) / len(timings):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Synthetic inputs for the benchmark suite.
+
+Everything is generated locally and deterministically from a seed: stand-in
+models with the same input columns as the real ones (so the prediction code
+paths are unchanged, only the fitted numbers differ) and short videos made
+by animating the portrait bundled with matplotlib. The portrait is a head
+and shoulders shot, so pose estimation runs the full detector on most
+frames; that is the slower path and a fair upper bound for timing.
+
+Usage:
+    python -m benchmarks.fixtures [folder]
+"""
+import os
+import sys
+
+import numpy as np
+
+
+# Video fixtures as name: (frames, motion period in frames)
+VIDEOS = {
+    "correct.mp4": (90, 30),
+    "wrong.mp4": (75, 24),
+}
+
+
+def make_meal_plan_model(path, samples=2000, seed=0):
+    from sklearn.ensemble import RandomForestRegressor
+    import joblib
+
+    from meal_plan_cache import feature_frame
+
+    rng = np.random.default_rng(seed)
+    age = rng.integers(18, 80, samples)
+    height = rng.uniform(1.5, 2.0, samples)
+    weight = rng.uniform(45, 130, samples)
+    gender = rng.choice(["F", "M"], samples)
+    bmr = 10 * weight + 625 * height - 5 * age + np.where(gender == "M", 5, -161)
+    activity_level = rng.choice([1.2, 1.375, 1.55, 1.725, 1.9], samples)
+
+    features = feature_frame(age, weight, height, weight / height ** 2, bmr, activity_level, gender)
+    calories = bmr * activity_level + rng.normal(0, 30, samples)
+    model = RandomForestRegressor(n_estimators=50, random_state=seed).fit(features, calories)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    joblib.dump(model, path)
+
+
+def make_exercise_models(models_dir, members=300, seed=0):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import OneHotEncoder
+    import joblib
+
+    from excercise_intensity import MODEL_FILES, build_feature_frame, exercise_list
+
+    rng = np.random.default_rng(seed)
+    height = rng.uniform(150, 200, members)
+    weight = rng.uniform(45, 130, members)
+    features = build_feature_frame([
+        {"gender": gender, "age": age, "weight": w, "height": h, "bmi": w / (h / 100) ** 2, "duration": duration}
+        for gender, age, w, h, duration in zip(
+            rng.choice(["Male", "Female"], members), rng.integers(18, 70, members), weight, height,
+            rng.integers(10, 90, members))
+    ])
+    exercise = features["Exercise Name"].map({name: i for i, name in enumerate(exercise_list)}).to_numpy()
+    targets = {
+        "set_count": 2 + exercise % 3 + features["Duration"].to_numpy() / 30,
+        "rep_count": 8 + exercise + features["Duration"].to_numpy() / 10,
+        "intensity": 3 + features["BMI"].to_numpy() / 10 + exercise / 4,
+    }
+
+    os.makedirs(models_dir, exist_ok=True)
+    for name, target in targets.items():
+        model = make_pipeline(
+            ColumnTransformer([("categories", OneHotEncoder(handle_unknown="ignore"), ["Exercise Name", "Gender"])],
+                              remainder="passthrough"),
+            RandomForestRegressor(n_estimators=30, random_state=seed),
+        ).fit(features, target + rng.normal(0, 0.2, len(target)))
+        joblib.dump(model, os.path.join(models_dir, MODEL_FILES[name]))
+
+
+def make_video(path, frames, period, fps=30, max_side=480):
+    """Write a clip of the bundled portrait swaying and zooming with the given period."""
+    import cv2
+    from matplotlib import cbook
+
+    image = cv2.imread(cbook.get_sample_data("grace_hopper.jpg", asfileobj=False))
+    scale = max_side / max(image.shape[:2])
+    image = cv2.resize(image, (round(image.shape[1] * scale) // 2 * 2, round(image.shape[0] * scale) // 2 * 2))
+    height, width = image.shape[:2]
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    try:
+        for frame in range(frames):
+            phase = 2 * np.pi * frame / period
+            matrix = cv2.getRotationMatrix2D((width / 2, height / 2), 8 * np.sin(phase), 1 + 0.05 * np.cos(phase))
+            writer.write(cv2.warpAffine(image, matrix, (width, height), borderMode=cv2.BORDER_REFLECT))
+    finally:
+        writer.release()
+
+
+def prepare(folder):
+    """
+    Create every fixture in ``folder`` (skipping those that already exist)
+    laid out like the service's working directory, so the entry points can
+    run from it unchanged.
+
+    Returns:
+        dict: Absolute paths of the generated videos by name
+    """
+    from excercise_intensity import MODEL_FILES
+    from meal_plan_cache import MODEL_PATH
+
+    folder = os.path.abspath(folder)
+    os.makedirs(folder, exist_ok=True)
+
+    meal_plan_model = os.path.join(folder, MODEL_PATH)
+    if not os.path.exists(meal_plan_model):
+        make_meal_plan_model(meal_plan_model)
+
+    models_dir = os.path.join(folder, "models", "fitness")
+    if not all(os.path.exists(os.path.join(models_dir, filename)) for filename in MODEL_FILES.values()):
+        make_exercise_models(models_dir)
+
+    # The nutrition workbook is real data, shared with the repository
+    nutrition = os.path.join(folder, "nutrition.xlsx")
+    if not os.path.exists(nutrition):
+        os.symlink(os.path.abspath("nutrition.xlsx"), nutrition)
+
+    videos = {}
+    for name, (frames, period) in VIDEOS.items():
+        videos[name] = os.path.join(folder, "videos", name)
+        if not os.path.exists(videos[name]):
+            os.makedirs(os.path.dirname(videos[name]), exist_ok=True)
+            make_video(videos[name], frames, period)
+    return videos
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else ".cache/bench"
+    prepare(target)
+    print(f"Benchmark fixtures ready in {os.path.abspath(target)}")
@@ -0,0 +1,65 @@
+"""
+Import-time profile of the app.
+
+Imports a module (``main`` by default) in a fresh interpreter with
+``python -X importtime`` and reports the total, the slowest top-level
+packages by cumulative import time, and which of the heavy subsystems got
+loaded. Importing ``main`` should load none of the video stack; it is only
+imported by the first sport analysis.
+
+Usage:
+    python -m benchmarks.import_time [--module main] [--top 15]
+"""
+import argparse
+import subprocess
+import sys
+
+
+# Subsystems that are expensive to import, by top-level package
+HEAVY_PACKAGES = ("cv2", "mediapipe", "matplotlib", "moviepy", "scipy", "boto3", "sklearn", "pandas", "openpyxl")
+
+
+def profile(module):
+    """
+    Returns:
+        list: (package, cumulative microseconds) of every top-level package
+            imported by ``module``, in import order
+    """
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True)
+    if output.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{output.stderr[-2000:]}")
+
+    packages = []
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        # Every module is imported once, so the line of a top-level package
+        # holds the cumulative time of everything it pulled in
+        if cumulative.strip().isdigit() and "." not in name:
+            packages.append((name, int(cumulative)))
+    return packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    packages = dict(profile(args.module))
+    print(f"import {args.module}: {packages[args.module] / 1e6:.3f}s")
+    print()
+    print(f"{'package':<28} {'seconds':>8}")
+    for package, cumulative in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<28} {cumulative / 1e6:8.3f}")
+    print()
+    for package in HEAVY_PACKAGES:
+        status = f"loaded ({packages[package] / 1e6:.3f}s)" if package in packages else "not loaded"
+        print(f"{package:<28} {status}")
+
+
+if __name__ == "__main__":
+    main()
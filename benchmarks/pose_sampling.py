@@ -0,0 +1,70 @@
+"""
+Accuracy and speed of the pose extraction sampling modes.
+
+Runs track_video over a grid of frame strides and downscale sizes and
+compares every setting against full-rate, full-resolution extraction: the
+wall time and speedup, the mean absolute error of the interpolated elbow
+angles per video, and how far the similarity percentage of the pair drifts
+from the baseline.
+
+Usage:
+    python -m benchmarks.pose_sampling correct.mp4 wrong.mp4 [--strides 1 2 3 4] [--max-sides 0 720 480]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from sport_analysis import track_video, calculate_cosine_similarity
+
+
+def extract(video_path, **options):
+    start = time.perf_counter()
+    track = track_video(video_path, **options)
+    return track, time.perf_counter() - start
+
+
+def angle_error(baseline, track):
+    """Mean absolute angle difference over the frames both tracks measured."""
+    reference = dict(zip(baseline["frame_indices"], baseline["angles"]))
+    errors = [abs(reference[frame] - angle)
+              for frame, angle in zip(track["frame_indices"], track["angles"]) if frame in reference]
+    return float(np.mean(errors)) if errors else float("nan")
+
+
+def similarity(correct, wrong):
+    return calculate_cosine_similarity(correct["angles"], wrong["angles"]) * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("correct_video")
+    parser.add_argument("wrong_video")
+    parser.add_argument("--strides", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--max-sides", type=int, nargs="+", default=[0, 720, 480],
+                        help="Longest frame side in pixels, 0 for the source resolution")
+    args = parser.parse_args()
+
+    baseline_correct, correct_seconds = extract(args.correct_video)
+    baseline_wrong, wrong_seconds = extract(args.wrong_video)
+    baseline_seconds = correct_seconds + wrong_seconds
+    baseline_similarity = similarity(baseline_correct, baseline_wrong)
+    print(f"baseline: {baseline_seconds:.2f}s  similarity {baseline_similarity:.2f}%")
+    print(f"{'stride':>6} {'max side':>8} {'seconds':>8} {'speedup':>8} {'MAE correct':>12} {'MAE wrong':>10} {'drift':>8}")
+
+    for max_side in args.max_sides:
+        for stride in args.strides:
+            if stride == 1 and not max_side:
+                continue
+            options = {"stride": stride, "max_side": max_side or None}
+            correct, correct_seconds = extract(args.correct_video, **options)
+            wrong, wrong_seconds = extract(args.wrong_video, **options)
+            seconds = correct_seconds + wrong_seconds
+            drift = similarity(correct, wrong) - baseline_similarity
+            print(f"{stride:>6} {max_side or 'source':>8} {seconds:>8.2f} {baseline_seconds / seconds:>7.2f}x "
+                  f"{angle_error(baseline_correct, correct):>11.2f}° {angle_error(baseline_wrong, wrong):>9.2f}° "
+                  f"{drift:>+7.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Speed of the similarity methods on long angle series.
+
+Compares two synthetic rep sequences where the second one is performed
+about 20% slower, so truncated cosine similarity misaligns them while DTW
+and resampling do not. DTW is timed for several band widths; the full
+(unbanded) matrix is only computed up to --full-max frames.
+
+Usage:
+    python -m benchmarks.similarity [--frames 1000 10000 20000] [--bands 0.05 0.1] [--full-max 5000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from similarity import compare_series
+
+
+def reps(frames, period):
+    t = np.arange(frames)
+    return 90 + 60 * np.sin(2 * np.pi * t / period)
+
+
+def timed(a, b, **options):
+    start = time.perf_counter()
+    result = compare_series(a, b, **options)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, nargs="+", default=[1000, 10000, 20000])
+    parser.add_argument("--bands", type=float, nargs="+", default=[0.05, 0.1])
+    parser.add_argument("--full-max", type=int, default=5000, help="Largest input to run unbanded DTW on")
+    args = parser.parse_args()
+
+    print(f"{'frames':>7} {'method':>16} {'seconds':>8} {'similarity':>11} {'distance':>9}")
+    for frames in args.frames:
+        correct = reps(frames, period=90.0)
+        wrong = reps(int(frames * 1.2), period=108.0)
+
+        runs = [("cosine", {"method": "cosine"}), ("resample", {"method": "resample"})]
+        runs += [(f"dtw band={band:g}", {"method": "dtw", "band": band}) for band in args.bands]
+        if frames <= args.full_max:
+            runs.append(("dtw full", {"method": "dtw", "band": None}))
+
+        for name, options in runs:
+            result, seconds = timed(correct, wrong, **options)
+            print(f"{frames:>7} {name:>16} {seconds:>8.3f} {result['similarity']:>10.2f}% {result['distance']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
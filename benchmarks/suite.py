@@ -0,0 +1,354 @@
+"""
+End-to-end benchmark of the service entry points.
+
+Runs every benchmark in a fresh interpreter against the synthetic fixtures
+(see benchmarks.fixtures) and reports:
+
+- cold start: seconds from launching the interpreter to the end of the
+  first call, so imports, model loading and cache builds are included
+- p50 / p99 / mean latency of the calls after the first one
+- throughput in requests, or frames for the video benchmarks, per second
+- peak RSS of the benchmark process and of its worker processes
+
+Results can be saved as a baseline and later runs compared against it. A
+metric that got worse by more than --threshold is reported as a regression,
+and --fail-on-regression turns that into a non-zero exit status for CI.
+Latency varies between machines, so compare runs made on the same one; the
+baseline records the machine it was taken on.
+
+Usage:
+    python -m benchmarks.suite [--only meal_plan api_meal_plan] [--iterations 50]
+    python -m benchmarks.suite --save-baseline
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --fail-on-regression
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+RESULT_PREFIX = "BENCH_RESULT "
+
+# Lower is better for every metric except throughput
+COMPARED_METRICS = ("cold_start_s", "p50_ms", "p99_ms", "throughput", "peak_rss_mb")
+# The tail of a few hundred calls is mostly noise, so p99 is shown but never flagged
+GATED_METRICS = ("cold_start_s", "p50_ms", "throughput", "peak_rss_mb")
+
+
+def meal_plan_profiles(count, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    profiles = []
+    for _ in range(count):
+        gender = str(rng.choice(["F", "M"]))
+        height = round(float(rng.uniform(1.5, 2.0)), 2)
+        weight = round(float(rng.uniform(45, 130)), 1)
+        age = int(rng.integers(18, 80))
+        profiles.append({
+            "age": age,
+            "weight": weight,
+            "height": height,
+            "bmi": round(weight / height ** 2, 2),
+            "bmr": round(10 * weight + 625 * height - 5 * age + (5 if gender == "M" else -161), 1),
+            "activity_level": float(rng.choice([1.2, 1.375, 1.55, 1.725, 1.9])),
+            "gender": gender,
+            "number_of_meals": 3,
+            "number_of_options": 15,
+        })
+    return profiles
+
+
+def exercise_members(count, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    members = []
+    for _ in range(count):
+        height = round(float(rng.uniform(150, 200)), 1)
+        weight = round(float(rng.uniform(45, 130)), 1)
+        members.append({
+            "gender": str(rng.choice(["Male", "Female"])),
+            "age": int(rng.integers(18, 70)),
+            "weight": weight,
+            "height": height,
+            "bmi": round(weight / (height / 100) ** 2, 2),
+            "duration": int(rng.integers(10, 90)),
+        })
+    return members
+
+
+# Every setup function gets the fixture videos as name: (path, frames),
+# imports the code under test (so the import counts towards the cold start)
+# and returns a call(i) running the i-th request and returning how many items
+# it processed.
+
+def setup_meal_plan(videos, iterations, scratch):
+    from meal_plan_prediction import predict_meal_plan
+
+    # Distinct profiles so every call reaches the model instead of the LRU
+    profiles = meal_plan_profiles(iterations)
+    return lambda i: predict_meal_plan(**profiles[i]) and 1
+
+
+def setup_exercise(videos, iterations, scratch):
+    from excercise_intensity import get_exercise_predictions
+
+    members = exercise_members(iterations)
+    return lambda i: get_exercise_predictions(**members[i]) and 1
+
+
+def setup_process_video(videos, iterations, scratch):
+    from sport_analysis import process_video
+
+    return lambda i: len(process_video(videos["correct.mp4"][0])[0])
+
+
+def setup_analyze_arm_angles(videos, iterations, scratch):
+    from sport_analysis import analyze_arm_angles
+
+    def call(i):
+        analyze_arm_angles(videos["correct.mp4"][0], videos["wrong.mp4"][0], output_folder=scratch)
+        return videos["correct.mp4"][1] + videos["wrong.mp4"][1]
+
+    return call
+
+
+def _api_client():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    # Run the lifespan hook like a server start would
+    client.__enter__()
+    return client
+
+
+def setup_api_meal_plan(videos, iterations, scratch):
+    client = _api_client()
+    profiles = meal_plan_profiles(iterations, seed=1)
+
+    def call(i):
+        response = client.post("/fitness-project/get-meal-plan", json=profiles[i])
+        response.raise_for_status()
+        return 1
+
+    return call
+
+
+def setup_api_exercise_intensity(videos, iterations, scratch):
+    client = _api_client()
+    members = exercise_members(iterations, seed=1)
+
+    def call(i):
+        member = dict(members[i])
+        member["actual_weight"] = member.pop("weight")
+        response = client.post("/fitness-project/get-exercise-intensity", json=member)
+        response.raise_for_status()
+        return 1
+
+    return call
+
+
+# name: (setup, default iterations, throughput unit)
+BENCHMARKS = {
+    "meal_plan": (setup_meal_plan, 200, "requests"),
+    "exercise": (setup_exercise, 200, "requests"),
+    "process_video": (setup_process_video, 5, "frames"),
+    "analyze_arm_angles": (setup_analyze_arm_angles, 3, "frames"),
+    "api_meal_plan": (setup_api_meal_plan, 200, "requests"),
+    "api_exercise_intensity": (setup_api_exercise_intensity, 200, "requests"),
+}
+
+# Sport analysis over HTTP downloads its videos from S3, so it is covered by
+# the process_video and analyze_arm_angles benchmarks instead of an API one.
+
+
+def _peak_rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def _workers_peak_rss_mb():
+    """Summed peak RSS of the live child processes (pose workers), None where /proc is not available."""
+    try:
+        task_dir = f"/proc/{os.getpid()}/task"
+        children = set()
+        for task in os.listdir(task_dir):
+            with open(os.path.join(task_dir, task, "children")) as f:
+                children.update(f.read().split())
+    except OSError:
+        return None
+
+    total = 0
+    for pid in children:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        total += int(line.split()[1])
+        except OSError:
+            continue
+    return total / 2 ** 10
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_child(name, workdir, iterations, launched_at):
+    """Run one benchmark in this process and print its result as a JSON line."""
+    setup, _, unit = BENCHMARKS[name]
+    os.chdir(workdir)
+    from benchmarks.fixtures import VIDEOS
+    videos = {video: (os.path.join(workdir, "videos", video), frames) for video, (frames, _) in VIDEOS.items()}
+
+    # Files a benchmark writes (rendered videos and graphs) go to a scratch
+    # folder next to the fixtures that is removed when the benchmark ends
+    with tempfile.TemporaryDirectory(prefix="scratch-", dir=workdir) as scratch:
+        # One extra request for the cold call
+        call = setup(videos, iterations + 1, scratch)
+        call(0)
+        cold_start = time.time() - launched_at
+
+        latencies = []
+        items = 0
+        start = time.perf_counter()
+        for i in range(1, iterations + 1):
+            call_start = time.perf_counter()
+            items += call(i)
+            latencies.append(time.perf_counter() - call_start)
+        elapsed = time.perf_counter() - start
+
+    result = {
+        "iterations": iterations,
+        "cold_start_s": round(cold_start, 4),
+        "p50_ms": round(_percentile(latencies, 0.5) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "throughput": round(items / elapsed, 3),
+        "unit": f"{unit}/s",
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "workers_peak_rss_mb": _workers_peak_rss_mb(),
+    }
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+def run_benchmark(name, workdir, iterations):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    env.setdefault("LOG_LEVEL", "WARNING")
+    # Metrics of the benchmark processes stay inside the work directory
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    command = [sys.executable, "-m", "benchmarks.suite", "--child", name, "--workdir", workdir,
+               "--iterations", str(iterations), "--launched-at", repr(time.time())]
+    output = subprocess.run(command, env=env, capture_output=True, text=True)
+    for line in reversed(output.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"Benchmark {name} failed:\n{output.stderr[-4000:]}")
+
+
+def machine_info():
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Print every metric next to its baseline value.
+
+    Returns:
+        list: (benchmark, metric, change) of every metric that got worse by
+            more than ``threshold`` (a fraction)
+    """
+    if baseline["machine"] != results["machine"]:
+        print(f"warning: baseline was taken on a different machine: {baseline['machine']}")
+
+    regressions = []
+    print(f"{'benchmark':<24} {'metric':<13} {'baseline':>11} {'current':>11} {'change':>8}")
+    for name, current in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            print(f"{name:<24} (not in baseline)")
+            continue
+        for metric in COMPARED_METRICS:
+            if not previous.get(metric):
+                continue
+            change = current[metric] / previous[metric] - 1
+            worse = -change if metric == "throughput" else change
+            flag = ""
+            if metric not in GATED_METRICS:
+                pass
+            elif worse > threshold:
+                flag = "  REGRESSION"
+                regressions.append((name, metric, change))
+            elif worse < -threshold:
+                flag = "  improved"
+            print(f"{name:<24} {metric:<13} {previous[metric]:>11} {current[metric]:>11} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks to run, all by default")
+    parser.add_argument("--iterations", type=int, help="Timed calls per benchmark, overriding the defaults")
+    parser.add_argument("--workdir", default=".cache/bench", help="Where fixtures are generated")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--launched-at", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.workdir, args.iterations, args.launched_at)
+        return
+
+    from benchmarks.fixtures import prepare
+    workdir = os.path.abspath(args.workdir)
+    prepare(workdir)
+
+    results = {"machine": machine_info(), "benchmarks": {}}
+    for name in args.only or BENCHMARKS:
+        iterations = args.iterations or BENCHMARKS[name][1]
+        result = results["benchmarks"][name] = run_benchmark(name, workdir, iterations)
+        print(f"{name:<24} cold {result['cold_start_s']:7.2f}s  p50 {result['p50_ms']:9.2f}ms  "
+              f"p99 {result['p99_ms']:9.2f}ms  {result['throughput']:9.1f} {result['unit']:<11} "
+              f"rss {result['peak_rss_mb']:7.1f}MB", flush=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        print()
+        regressions = compare(results, json.load(open(args.baseline)), args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
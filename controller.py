@@ -1,12 +1,15 @@
-from s3_download import download_s3_file
-from s3_upload import upload_to_s3
-from excercise_intensity import get_exercise_predictions
-from meal_plan_prediction import predict_meal_plan
-from sport_analysis import  analyze_arm_angles
+from excercise_intensity import get_exercise_predictions, get_bulk_exercise_predictions
+from meal_plan_prediction import predict_meal_plan, meal_plan_cache
+from pipeline import run_rep_analysis, run_sport_analysis
+from model_registry import registry
+from jobs import JobQueue, QueueFull, create_job_store
+from executors import inference_executor, video_executor
+from joints import DEFAULT_JOINT, validate_joints
 import os 
-import shutil
+import threading
+from typing import Literal
 from pydantic import BaseModel
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 
 class MealPlanInput(BaseModel):
      age:int
@@ -18,6 +21,7 @@ class MealPlanInput(BaseModel):
      gender:str 
      number_of_meals:int 
      number_of_options:int
+     selection:Literal["first", "closest", "diverse"] = "first"
 
 class ExerciseIntensity(BaseModel):
      actual_weight:float 
@@ -28,29 +32,93 @@ class ExerciseIntensity(BaseModel):
      height:float 
     #  weather:str 
 
+class BulkExerciseIntensity(BaseModel):
+     members:list[ExerciseIntensity]
+
 class SportAnalysis(BaseModel):
      correct_video:str 
      incorrect_video:str 
+     joints:list[str] = [DEFAULT_JOINT]
+     similarity_method:Literal["dtw", "resample", "cosine"] | None = None
+     outputs:list[Literal["pose_videos", "angle_comparison_video", "final_graph"]] | None = None
+
+class RepAnalysis(BaseModel):
+     correct_video:str
+     incorrect_video:str
+     joint:str = DEFAULT_JOINT
+     similarity_method:Literal["dtw", "resample", "cosine"] | None = None
 
 router = APIRouter()
 
+# Hint sent with 429 responses
+RETRY_AFTER_SECONDS = os.environ.get("RETRY_AFTER_SECONDS", "1")
+
+
+_job_store = None
+_job_queues = {}
+_job_queue_lock = threading.Lock()
+
+
+def get_job_store():
+    """The store of every job, selected by JOB_STORE, created on first use."""
+    global _job_store
+    with _job_queue_lock:
+        if _job_store is None:
+            _job_store = create_job_store(os.environ.get("JOB_STORE", "memory"))
+        return _job_store
+
+
+def get_job_queue(func=run_sport_analysis):
+    """
+    Create the job queue running ``func`` on first use.
+
+    Every kind of sport analysis job has its own queue, but they share the
+    job store and their limits: SPORT_ANALYSIS_MAX_JOBS limits how many analyses run at once,
+    SPORT_ANALYSIS_QUEUE_SIZE how many more may wait, and JOB_STORE selects
+    the job store ("memory" or "sqlite:///path/to/jobs.db"). Both limits
+    hold for all server processes on the host together; with several
+    workers the store must be SQLite, which gunicorn.conf.py makes the default.
+    Finished jobs are kept for JOB_TTL_SECONDS (default an hour).
+    """
+    store = get_job_store()
+    with _job_queue_lock:
+        if func not in _job_queues:
+            _job_queues[func] = JobQueue(
+                func,
+                store=store,
+                max_concurrent=int(os.environ.get("SPORT_ANALYSIS_MAX_JOBS", 1)),
+                max_queued=int(os.environ.get("SPORT_ANALYSIS_QUEUE_SIZE", 8)),
+                name="sport-analysis"
+            )
+        return _job_queues[func]
+
 
-def clean_folder(folder_path):
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
-        try:
-            if os.path.isfile(file_path) or os.path.islink(file_path):
-                os.unlink(file_path) 
-            elif os.path.isdir(file_path):
-                shutil.rmtree(file_path)  
-            print(f"Removed: {file_path}")
-        except Exception as e:
-            print(f"Failed to delete {file_path}. Reason: {e}")
+def shutdown_job_queue():
+    global _job_store
+    with _job_queue_lock:
+        for queue in _job_queues.values():
+            queue.shutdown(wait=False)
+        _job_queues.clear()
+        _job_store = None
+
+async def run_or_429(executor, func, *args, **kwargs):
+     """
+     Run CPU-bound work in one of the bounded executors, so the event loop
+     stays free for other requests. Model inference runs in a thread pool and
+     video analysis in a process pool; when the pool is at capacity the
+     request is rejected with 429 instead of waiting.
+     """
+     try:
+          return await executor.run(func, *args, **kwargs)
+     except QueueFull as e:
+          raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": RETRY_AFTER_SECONDS})
 
 @router.post("/get-meal-plan")
-def get_meal_plan(meal_plan:MealPlanInput):
+async def get_meal_plan(meal_plan:MealPlanInput):
      
-    meal_plan = predict_meal_plan(
+    meal_plan = await run_or_429(
+        inference_executor,
+        predict_meal_plan,
         age=meal_plan.age,
         weight=meal_plan.weight,
         height=meal_plan.height,
@@ -59,13 +127,20 @@ def get_meal_plan(meal_plan:MealPlanInput):
         activity_level=meal_plan.activity_level,
         gender=meal_plan.gender, 
         number_of_meals=meal_plan.number_of_meals, 
-        number_of_options=meal_plan.number_of_options
+        number_of_options=meal_plan.number_of_options,
+        selection=meal_plan.selection
     )
     return meal_plan
 
+@router.get("/meal-plan/stats")
+def get_meal_plan_stats():
+     return meal_plan_cache.stats()
+
 @router.post("/get-exercise-intensity")
-def get_exercise_intensity_level(exercise_intensity:ExerciseIntensity):
-     intensity_level = get_exercise_predictions(
+async def get_exercise_intensity_level(exercise_intensity:ExerciseIntensity):
+     intensity_level = await run_or_429(
+          inference_executor,
+          get_exercise_predictions,
           weight=exercise_intensity.actual_weight , 
           age=exercise_intensity.age , 
           gender=exercise_intensity.gender , 
@@ -77,25 +152,85 @@ def get_exercise_intensity_level(exercise_intensity:ExerciseIntensity):
 
      return intensity_level
 
+@router.post("/get-exercise-intensity/bulk")
+async def get_bulk_exercise_intensity_level(bulk:BulkExerciseIntensity):
+     members = [
+          {
+               "weight": member.actual_weight,
+               "age": member.age,
+               "gender": member.gender,
+               "duration": member.duration,
+               "bmi": member.bmi,
+               "height": member.height
+          }
+          for member in bulk.members
+     ]
+
+     return await run_or_429(inference_executor, get_bulk_exercise_predictions, members)
+
+@router.get("/models")
+def get_model_stats():
+     return registry.stats()
+
+def check_joints(joints):
+     try:
+          return validate_joints(joints)
+     except ValueError as e:
+          raise HTTPException(status_code=422, detail=str(e))
+
 @router.post("/sport-analysis")
-def get_sport_analysis(sport_analysis:SportAnalysis):
-     correct_video_path = download_s3_file(url=sport_analysis.correct_video , output_path="temp/correct_video.mp4")     
-     incorrect_video_path = download_s3_file(url=sport_analysis.incorrect_video , output_path='temp/incorrect_video.mp4')
-     result = analyze_arm_angles(correct_video_path=correct_video_path , wrong_video_path=incorrect_video_path , output_folder="temp")
+async def get_sport_analysis(sport_analysis:SportAnalysis):
+     joints = check_joints(sport_analysis.joints)
+     return await run_or_429(
+          video_executor,
+          run_sport_analysis,
+          correct_video=sport_analysis.correct_video,
+          incorrect_video=sport_analysis.incorrect_video,
+          joints=joints,
+          similarity_method=sport_analysis.similarity_method,
+          outputs=sport_analysis.outputs
+     )
 
-     correct_video = upload_to_s3(file_path=result['correct_pose_video'])
-     wrong_video = upload_to_s3(file_path=result['wrong_pose_video'])
-     angle_comparison = upload_to_s3(file_path=result['angle_comparison_video'])
-     final_graph = upload_to_s3(file_path=result['final_graph'])
+@router.post("/sport-analysis/jobs", status_code=202)
+def submit_sport_analysis(sport_analysis:SportAnalysis):
+     joints = check_joints(sport_analysis.joints)
+     return submit_job(
+          run_sport_analysis,
+          correct_video=sport_analysis.correct_video,
+          incorrect_video=sport_analysis.incorrect_video,
+          joints=joints,
+          similarity_method=sport_analysis.similarity_method,
+          outputs=sport_analysis.outputs
+     )
+
+@router.post("/sport-analysis/reps/jobs", status_code=202)
+def submit_rep_analysis(rep_analysis:RepAnalysis):
+     """
+     Score every rep of a long session in the background. While the job
+     runs, GET /sport-analysis/jobs/{job_id} returns the reps scored so far
+     as its ``result``.
+     """
+     joint = check_joints([rep_analysis.joint])[0]
+     return submit_job(
+          run_rep_analysis,
+          correct_video=rep_analysis.correct_video,
+          incorrect_video=rep_analysis.incorrect_video,
+          joint=joint,
+          similarity_method=rep_analysis.similarity_method
+     )
 
-     clean_folder(folder_path='temp')
+def submit_job(func, **kwargs):
+     try:
+          job_id = get_job_queue(func).submit(**kwargs)
+     except QueueFull as e:
+          raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": RETRY_AFTER_SECONDS})
 
-     return {
-          "correct_video": correct_video , 
-          "wrong_video": wrong_video , 
-          "angle_comparison_video":angle_comparison , 
-          "final_graph": final_graph,
-          "similarity" : result['similarity_percentage']
-     }
+     return {"job_id": job_id, "status": "queued"}
 
+@router.get("/sport-analysis/jobs/{job_id}")
+def get_sport_analysis_job(job_id:str):
+     job = get_job_store().get(job_id)
+     if job is None:
+          raise HTTPException(status_code=404, detail="Job not found")
 
+     return job
@@ -1,7 +1,8 @@
 import pandas as pd
 import numpy as np
-import joblib
 import os
+from model_registry import registry
+from metrics import timed
 
 # Define the list of exercises based on the training data
 exercise_list = [
@@ -17,6 +18,127 @@ exercise_list = [
     "Leg Raises"
 ]
 
+MODEL_FILES = {
+    "set_count": "set_count_model.joblib",
+    "rep_count": "rep_count_model.joblib",
+    "intensity": "intensity_rate_model.joblib",
+}
+
+
+def model_paths(models_dir="models/fitness"):
+    return {name: os.path.join(models_dir, filename) for name, filename in MODEL_FILES.items()}
+
+
+def load_models(models_dir="models/fitness"):
+    """
+    Return the set-count, rep-count and intensity models from the shared registry.
+    Models are deserialized once per process and reloaded when their file changes.
+    """
+    paths = model_paths(models_dir)
+    return (
+        registry.get(paths["set_count"]),
+        registry.get(paths["rep_count"]),
+        registry.get(paths["intensity"]),
+    )
+
+
+def build_feature_frame(members):
+    """
+    Build one feature row per (member, exercise) pair.
+
+    Rows are grouped by member, with the exercises in ``exercise_list`` order,
+    so row ``i * len(exercise_list) + j`` holds exercise ``j`` for member ``i``.
+    """
+    keys = ('gender', 'age', 'weight', 'height', 'bmi', 'duration')
+    return feature_frame(*([member[key] for member in members] for key in keys))
+
+
+def feature_frame(gender, age, weight, height, bmi, duration):
+    """Same rows as build_feature_frame, from one array per member attribute."""
+    n_exercises = len(exercise_list)
+
+    def repeat(values):
+        return np.repeat(values, n_exercises)
+
+    return pd.DataFrame({
+        'Exercise Name': np.tile(exercise_list, len(gender)),
+        'Gender': repeat(gender),
+        'Age': repeat(age),
+        'Weight': repeat(weight),
+        'Height': repeat(height),
+        'BMI': repeat(bmi),
+        'Duration': repeat(duration)
+    })
+
+
+def predict_exercise_matrix(gender, age, weight, height, bmi, duration, models_dir="models/fitness"):
+    """
+    Predictions for many members as arrays, for batch scoring.
+
+    Parameters:
+    gender, age, weight, height, bmi, duration: One value per member (array-like)
+    models_dir: Directory containing the saved model files (str)
+
+    Returns:
+    Set counts, rep counts and intensity rates, each an array of shape
+    (members, len(exercise_list)); set and rep counts are rounded like
+    get_bulk_exercise_predictions rounds them
+    """
+    set_count_model, rep_count_model, intensity_model = load_models(models_dir)
+    input_data = feature_frame(gender, age, weight, height, bmi, duration)
+    shape = (len(gender), len(exercise_list))
+    return (
+        np.rint(set_count_model.predict(input_data)).astype(np.int64).reshape(shape),
+        np.rint(rep_count_model.predict(input_data)).astype(np.int64).reshape(shape),
+        np.asarray(intensity_model.predict(input_data)).reshape(shape),
+    )
+
+
+@timed("exercise_prediction")
+def get_bulk_exercise_predictions(members, models_dir="models/fitness"):
+    """
+    Predict Set Count, Rep Count, and Intensity Rate for all exercises of many members at once.
+
+    Every model is called once over a single feature matrix covering all
+    members, instead of once per member and exercise.
+
+    Parameters:
+    members: List of dictionaries with gender, age, weight, height, bmi and duration keys
+    models_dir: Directory containing the saved model files (str)
+
+    Returns:
+    List with one get_exercise_predictions style dictionary per member, in input order
+    """
+    if not members:
+        return []
+
+    # Get the cached models
+    set_count_model, rep_count_model, intensity_model = load_models(models_dir)
+
+    input_data = build_feature_frame(members)
+
+    # Make predictions
+    set_count_preds = set_count_model.predict(input_data)
+    rep_count_preds = rep_count_model.predict(input_data)
+    intensity_preds = intensity_model.predict(input_data)
+
+    results = []
+    row = 0
+    for _ in members:
+        member_results = {}
+        for exercise in exercise_list:
+            # Round set count and rep count to integers
+            member_results[exercise] = {
+                'Set Count': round(set_count_preds[row]),
+                'Rep Count': round(rep_count_preds[row]),
+                'Intensity Rate': intensity_preds[row]
+            }
+            row += 1
+        results.append(member_results)
+
+    return results
+
+
 def get_exercise_predictions(gender, age, weight, height, bmi, duration, models_dir="models/fitness"):
     """
     A single function that predicts Set Count, Rep Count, and Intensity Rate for all exercises.
@@ -33,48 +155,15 @@ def get_exercise_predictions(gender, age, weight, height, bmi, duration, models_
     Returns:
     Dictionary with exercise names as keys and prediction dictionaries as values
     """
-    # Load the models
-    set_count_model_path = os.path.join(models_dir, "set_count_model.joblib")
-    rep_count_model_path = os.path.join(models_dir, "rep_count_model.joblib")
-    intensity_model_path = os.path.join(models_dir, "intensity_rate_model.joblib")
-    
-    set_count_model = joblib.load(set_count_model_path)
-    rep_count_model = joblib.load(rep_count_model_path)
-    intensity_model = joblib.load(intensity_model_path)
-    
-    # Dictionary to store results
-    results = {}
-    
-    # Make predictions for each exercise
-    for exercise in exercise_list:
-        # Create a dataframe with the input features
-        input_data = pd.DataFrame({
-            'Exercise Name': [exercise],
-            'Gender': [gender],
-            'Age': [age],
-            'Weight': [weight],
-            'Height': [height],
-            'BMI': [bmi],
-            'Duration': [duration]
-        })
-        
-        # Make predictions
-        set_count_pred = set_count_model.predict(input_data)[0]
-        rep_count_pred = rep_count_model.predict(input_data)[0]
-        intensity_pred = intensity_model.predict(input_data)[0]
-        
-        # Round set count and rep count to integers
-        set_count_pred_rounded = round(set_count_pred)
-        rep_count_pred_rounded = round(rep_count_pred)
-        
-        # Store predictions in dictionary
-        results[exercise] = {
-            'Set Count': set_count_pred_rounded,
-            'Rep Count': rep_count_pred_rounded,
-            'Intensity Rate': intensity_pred
-        }
-    
-    return results
+    member = {
+        'gender': gender,
+        'age': age,
+        'weight': weight,
+        'height': height,
+        'bmi': bmi,
+        'duration': duration
+    }
+    return get_bulk_exercise_predictions([member], models_dir=models_dir)[0]
 
 # Example usage
 if __name__ == "__main__":
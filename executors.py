@@ -0,0 +1,124 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from jobs import QueueFull
+from logs import configure_logging
+from slots import SharedSlots
+
+
+# Model inference (meal plans, exercise intensity) runs in threads of the API process
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", 4))
+INFERENCE_QUEUE_SIZE = int(os.environ.get("INFERENCE_QUEUE_SIZE", 64))
+# Synchronous sport analyses run in worker processes, so pose estimation
+# never holds the API process's GIL. Each analysis still spreads its two
+# videos over SPORT_ANALYSIS_WORKERS pose processes of its own. Both limits
+# hold for the whole host, not per gunicorn worker (see SharedSlots).
+VIDEO_WORKERS = int(os.environ.get("VIDEO_WORKERS", 1))
+VIDEO_QUEUE_SIZE = int(os.environ.get("VIDEO_QUEUE_SIZE", 4))
+
+
+class BoundedExecutor:
+    """
+    Thread or process pool that admits a bounded amount of work.
+
+    At most ``max_workers`` calls run at the same time and at most
+    ``max_queued`` more wait for a worker; calling beyond that raises
+    QueueFull straight away instead of letting requests pile up. A slot is
+    only freed when its call finishes, so a client that disconnects does not
+    make room for more work than the pool can do. The pool itself is created
+    on first use.
+
+    With ``shared=True`` both limits are SharedSlots, so they hold across
+    every process that has an executor of the same name, e.g. all gunicorn
+    workers, rather than per process.
+    """
+
+    def __init__(self, name, max_workers, max_queued, processes=False, shared=False):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.processes = processes
+        self.shared = shared
+        self._executor = None
+        self._lock = threading.Lock()
+        if shared:
+            slot_name = name.replace(" ", "-")
+            self._admitted = SharedSlots(f"{slot_name}-admitted", max_workers + max_queued)
+            self._running = SharedSlots(f"{slot_name}-running", max_workers)
+        else:
+            self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run ``func`` in the pool and wait for its result without blocking the event loop.
+
+        With a process pool, ``func``, its arguments and its result must be picklable.
+
+        Raises:
+            QueueFull: If the pool is at capacity
+        """
+        release = self._admit()
+        if self.shared:
+            func, args, kwargs = _run_in_slot, (self._running, func, args, kwargs), {}
+        try:
+            try:
+                future = self._get_executor().submit(func, *args, **kwargs)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for running out of memory); start a fresh pool
+                self.shutdown()
+                future = self._get_executor().submit(func, *args, **kwargs)
+        except Exception:
+            release()
+            raise
+        future.add_done_callback(lambda future: release())
+        return await asyncio.wrap_future(future)
+
+    def _admit(self):
+        """Take an admission slot and return the function that gives it back."""
+        if self.shared:
+            slot = self._admitted.try_acquire()
+            if slot is not None:
+                return lambda: SharedSlots.release(slot)
+        elif self._slots.acquire(blocking=False):
+            return self._slots.release
+        raise QueueFull(f"{self.name} is busy ({self.max_workers} running, {self.max_queued} queued)")
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.processes:
+                    # spawn for the same reason as the pose pools: mediapipe's native threads do not survive a fork
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                        initializer=configure_logging)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+            return self._executor
+
+
+def _run_in_slot(slots, func, args, kwargs):
+    # Work admitted by other server processes may be running; wait for a global slot
+    slot = slots.acquire()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        SharedSlots.release(slot)
+
+
+inference_executor = BoundedExecutor("inference", INFERENCE_THREADS, INFERENCE_QUEUE_SIZE)
+video_executor = BoundedExecutor("video analysis", VIDEO_WORKERS, VIDEO_QUEUE_SIZE, processes=True, shared=True)
+
+
+def shutdown_executors():
+    inference_executor.shutdown()
+    video_executor.shutdown()
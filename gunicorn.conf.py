@@ -0,0 +1,61 @@
+"""
+Production server: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+With PRELOAD_APP=1 (the default) the master imports the app and loads the
+models and the nutrition table once (main.preload), then forks the workers.
+The workers start without importing or loading anything and share those
+pages copy-on-write instead of holding a copy each. The video stack is not
+preloaded: sport analyses run in spawned processes (see executors).
+Models replaced on disk are still picked up by each worker on its next
+request (see model_registry).
+
+Every worker is a separate process, so state that must be seen by all of
+them lives outside the workers:
+- Sport analysis jobs default to a SQLite store (JOB_STORE), so a job
+  submitted to one worker can be polled through any other.
+- SPORT_ANALYSIS_MAX_JOBS, SPORT_ANALYSIS_QUEUE_SIZE, VIDEO_WORKERS and
+  VIDEO_QUEUE_SIZE are host-wide limits, shared through lock files in
+  SLOTS_DIR (see slots.SharedSlots), not per-worker limits.
+"""
+import gc
+import multiprocessing
+import os
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 3000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.environ.get("PRELOAD_APP", "1") == "1"
+# Sport analyses can hold a request for minutes
+timeout = int(os.environ.get("WORKER_TIMEOUT", 900))
+graceful_timeout = 30
+
+
+def on_starting(server):
+    # Sets the metrics directory in the master so every worker inherits the
+    # same one and /metrics reports the whole server, not just one worker
+    from metrics import setup_multiprocess_dir
+
+    setup_multiprocess_dir()
+
+    # The in-memory job store would give every worker its own jobs
+    os.environ.setdefault("JOB_STORE", "sqlite:///.cache/jobs.db")
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from main import preload
+
+    preload()
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers don't write to (and so copy) shared pages
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
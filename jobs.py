@@ -0,0 +1,309 @@
+import abc
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from logs import configure_logging
+from slots import SharedSlots
+
+
+# Finished jobs and their results are kept this long after they finish, in seconds
+JOB_TTL_SECONDS = float(os.environ.get("JOB_TTL_SECONDS", 3600))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the job queue is at capacity."""
+
+
+class JobStore(abc.ABC):
+    """
+    Storage backend for job state.
+
+    A job is a dictionary with ``id``, ``status``, ``stage``, ``payload``,
+    ``result``, ``error``, ``created_at`` and ``updated_at`` keys.
+    """
+
+    @abc.abstractmethod
+    def create(self, job_id, payload):
+        """Add a queued job."""
+
+    @abc.abstractmethod
+    def update(self, job_id, **fields):
+        """Set fields of an existing job and refresh its ``updated_at``."""
+
+    @abc.abstractmethod
+    def get(self, job_id):
+        """Return the job dictionary, or None if the job does not exist."""
+
+    @abc.abstractmethod
+    def evict(self, finished_before):
+        """Delete jobs that succeeded or failed before the ``finished_before`` timestamp."""
+
+    @staticmethod
+    def _new_job(job_id, payload):
+        now = time.time()
+        return {
+            "id": job_id,
+            "status": QUEUED,
+            "stage": None,
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+
+class InMemoryJobStore(JobStore):
+    """Keeps jobs in a dictionary; state is lost when the process exits."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id, payload):
+        with self._lock:
+            self._jobs[job_id] = self._new_job(job_id, payload)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            job["updated_at"] = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def evict(self, finished_before):
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job["status"] in (SUCCEEDED, FAILED) and job["updated_at"] < finished_before
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+class SQLiteJobStore(JobStore):
+    """Keeps jobs in a SQLite database so they survive restarts and can be shared between processes."""
+
+    COLUMNS = ("id", "status", "stage", "payload", "result", "error", "created_at", "updated_at")
+    JSON_COLUMNS = ("payload", "result")
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            # Every gunicorn worker opens the database; WAL lets them read while another one writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT, stage TEXT, payload TEXT, result TEXT, "
+                "error TEXT, created_at REAL, updated_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, updated_at)")
+
+    def create(self, job_id, payload):
+        job = self._encode(self._new_job(job_id, payload))
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' for _ in self.COLUMNS)})",
+                [job[column] for column in self.COLUMNS],
+            )
+
+    def update(self, job_id, **fields):
+        fields = self._encode(dict(fields, updated_at=time.time()))
+        unknown = set(fields) - set(self.COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {sorted(unknown)}")
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        for column in self.JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def evict(self, finished_before):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (SUCCEEDED, FAILED, finished_before)
+            )
+
+    def _encode(self, fields):
+        for column in self.JSON_COLUMNS:
+            if fields.get(column) is not None:
+                fields[column] = json.dumps(fields[column])
+        return fields
+
+
+def create_job_store(url="memory"):
+    """
+    Build a job store from a URL: ``memory`` or ``sqlite:///path/to/jobs.db``.
+    """
+    if url == "memory":
+        return InMemoryJobStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteJobStore(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported job store '{url}'")
+
+
+# Set in every worker process by _init_worker
+_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+    configure_logging()
+
+
+def _run_job(job_id, func, kwargs, running_slots):
+    def progress(stage, result=None):
+        _progress_queue.put((job_id, stage, result))
+
+    # Jobs admitted by other server processes may be running; wait for a global slot
+    slot = running_slots.acquire()
+    try:
+        _progress_queue.put((job_id, None, None))
+        return func(progress=progress, **kwargs)
+    finally:
+        SharedSlots.release(slot)
+
+
+class JobQueue:
+    """
+    Bounded queue of background jobs executed by worker processes.
+
+    At most ``max_concurrent`` jobs run at the same time and at most
+    ``max_queued`` more wait for a worker; submitting beyond that raises
+    QueueFull. Both limits are held in SharedSlots named after the queue, so
+    they apply to all queues of that name on the host together, e.g. one per
+    gunicorn worker. The job function must be importable (it is pickled to
+    the workers) and accept a ``progress`` keyword argument, a callable that
+    records the stage the job has reached and optionally a partial result,
+    which is stored as the job's ``result`` while it runs. Finished jobs are
+    deleted from the store ``ttl`` seconds after they finish.
+    """
+
+    def __init__(self, func, store, max_concurrent=1, max_queued=8, name="jobs", ttl=JOB_TTL_SECONDS):
+        self.func = func
+        self.store = store
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.ttl = ttl
+
+        self._context = multiprocessing.get_context("spawn")
+        self._progress_queue = self._context.Queue()
+        self._executor = self._new_executor()
+        self._admitted = SharedSlots(f"{name}-admitted", max_concurrent + max_queued)
+        self._running = SharedSlots(f"{name}-running", max_concurrent)
+        # Serializes status changes from the progress thread and completion callbacks
+        self._status_lock = threading.Lock()
+        self._progress_thread = threading.Thread(target=self._drain_progress, daemon=True)
+        self._progress_thread.start()
+
+    def submit(self, **kwargs):
+        """
+        Queue a job and return its id.
+
+        Raises:
+            QueueFull: If the queue is at capacity
+        """
+        slot = self._admitted.try_acquire()
+        if slot is None:
+            raise QueueFull(f"Job queue is full ({self.max_concurrent} running, {self.max_queued} queued)")
+
+        job_id = uuid.uuid4().hex
+        try:
+            # Jobs are only added here, so evicting here keeps the store bounded
+            self.store.evict(time.time() - self.ttl)
+            self.store.create(job_id, kwargs)
+            try:
+                future = self._executor.submit(_run_job, job_id, self.func, kwargs, self._running)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for running out of memory); start a fresh pool
+                self._executor = self._new_executor()
+                future = self._executor.submit(_run_job, job_id, self.func, kwargs, self._running)
+        except Exception as e:
+            if self.store.get(job_id) is not None:
+                self.store.update(job_id, status=FAILED, error=str(e))
+            SharedSlots.release(slot)
+            raise
+        future.add_done_callback(lambda future: self._finish(job_id, future, slot))
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._progress_queue.put(None)
+        if wait:
+            self._progress_thread.join()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.max_concurrent,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(self._progress_queue,),
+        )
+
+    def _finish(self, job_id, future, slot):
+        try:
+            with self._status_lock:
+                if future.cancelled():
+                    self.store.update(job_id, status=FAILED, error="cancelled")
+                    return
+                error = future.exception()
+                if error is None:
+                    self.store.update(job_id, status=SUCCEEDED, stage=None, result=future.result())
+                else:
+                    message = "".join(traceback.format_exception_only(type(error), error)).strip()
+                    self.store.update(job_id, status=FAILED, error=message)
+        finally:
+            SharedSlots.release(slot)
+
+    def _drain_progress(self):
+        while True:
+            message = self._progress_queue.get()
+            if message is None:
+                return
+            job_id, stage, result = message
+            with self._status_lock:
+                # Progress can arrive after the completion callback already ran
+                job = self.store.get(job_id)
+                if job is None or job["status"] in (SUCCEEDED, FAILED):
+                    continue
+                if stage is None:
+                    self.store.update(job_id, status=RUNNING)
+                elif result is None:
+                    self.store.update(job_id, stage=stage)
+                else:
+                    self.store.update(job_id, stage=stage, result=result)
@@ -0,0 +1,68 @@
+import numpy as np
+
+
+# Number of landmarks in a MediaPipe pose and the values stored per landmark
+NUM_LANDMARKS = 33
+LANDMARK_FIELDS = ("x", "y", "z", "visibility")
+
+# MediaPipe pose landmark indices
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+
+# Joint angles that can be measured, as (first point, vertex, second point)
+JOINTS = {
+    "left_elbow": (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    "right_elbow": (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    "left_shoulder": (LEFT_HIP, LEFT_SHOULDER, LEFT_ELBOW),
+    "right_shoulder": (RIGHT_HIP, RIGHT_SHOULDER, RIGHT_ELBOW),
+    "left_hip": (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    "right_hip": (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE),
+    "left_knee": (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    "right_knee": (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+}
+
+# The joint the sport analysis has always measured
+DEFAULT_JOINT = "left_elbow"
+
+
+def validate_joints(joints):
+    """
+    Raises:
+        ValueError: If a joint name is not in JOINTS
+    """
+    unknown = [joint for joint in joints if joint not in JOINTS]
+    if unknown:
+        raise ValueError(f"Unknown joints {unknown}, expected any of {sorted(JOINTS)}")
+    return list(joints)
+
+
+def joint_angles(landmarks, joints=(DEFAULT_JOINT,)):
+    """
+    Measure joint angles in every frame of a landmark series in one pass.
+
+    Args:
+        landmarks (np.ndarray): Array of shape (frames, 33, 4) as produced by
+            track_video; only the x and y coordinates are used
+        joints (iterable): Names of joints in JOINTS
+
+    Returns:
+        dict: Joint name to a float64 array of angles in degrees (0-180), one per frame
+    """
+    joints = validate_joints(joints)
+    if not joints:
+        return {}
+
+    indices = np.array([JOINTS[joint] for joint in joints])
+    # (frames, joints, 3 points, x/y)
+    points = np.asarray(landmarks)[:, indices, :2].astype(np.float64)
+    a, b, c = points[:, :, 0], points[:, :, 1], points[:, :, 2]
+
+    radians = np.arctan2(c[..., 1] - b[..., 1], c[..., 0] - b[..., 0]) - np.arctan2(a[..., 1] - b[..., 1], a[..., 0] - b[..., 0])
+    angles = np.abs(radians * 180.0 / np.pi)
+    angles = np.where(angles > 180.0, 360 - angles, angles)
+
+    return {joint: angles[:, i] for i, joint in enumerate(joints)}
@@ -1,9 +1,46 @@
-from fastapi import FastAPI
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from controller import router as fitness_project
+from logs import configure_logging
+from metrics import HTTP_LATENCY, HTTP_REQUESTS, render, setup_multiprocess_dir
+from controller import router as fitness_project, shutdown_job_queue
+from excercise_intensity import load_models
+from meal_plan_prediction import get_model, get_nutrition_index, get_profile_table
+from meal_plan_cache import MEAL_PLAN_PRECOMPUTE
+from executors import shutdown_executors
 
+configure_logging()
+setup_multiprocess_dir()
 
-app = FastAPI()
+
+def preload():
+    """
+    Load everything the prediction routes need: the exercise and meal plan
+    models, the nutrition table and, with MEAL_PLAN_PRECOMPUTE=1, the profile
+    table. Run by gunicorn's master before it forks the workers (see
+    gunicorn.conf.py), so they share these copy-on-write, or by every worker
+    at startup with PRELOAD_MODELS=1.
+    """
+    load_models()
+    get_model()
+    get_nutrition_index()
+    if MEAL_PLAN_PRECOMPUTE:
+        get_profile_table()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Models are loaded lazily on the first request unless preloading is requested
+    if os.environ.get("PRELOAD_MODELS", "0") == "1":
+        preload()
+    yield
+    shutdown_job_queue()
+    shutdown_executors()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware, 
     allow_origins=["*"] ,
@@ -15,4 +52,26 @@ app.add_middleware(
       
             
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template so ids in paths don't create new series
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_LATENCY.labels(request.method, path).observe(time.perf_counter() - start)
+        HTTP_REQUESTS.labels(request.method, path, str(status)).inc()
+
+
+@app.get("/metrics")
+def get_metrics():
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
+
+
 app.include_router(fitness_project , prefix="/fitness-project")
\ No newline at end of file
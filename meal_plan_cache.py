@@ -0,0 +1,233 @@
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+MODEL_PATH = "models/meal_plan_prediction_model.joblib"
+CACHE_ROOT = os.environ.get("MEAL_PLAN_CACHE_DIR", ".cache/meal_plan")
+# Serve quantized profiles from the precomputed table (see build_table)
+MEAL_PLAN_PRECOMPUTE = os.environ.get("MEAL_PLAN_PRECOMPUTE") == "1"
+# Optional JSON file overriding DEFAULT_GRID
+MEAL_PLAN_GRID = os.environ.get("MEAL_PLAN_GRID")
+# Responses kept for exact repeats of the same request
+MEAL_PLAN_LRU_SIZE = int(os.environ.get("MEAL_PLAN_LRU_SIZE", 1024))
+
+# Profiles scored by the precompute mode. Requests are snapped to the nearest
+# age and BMI band; activity level and gender must match a listed value.
+# The model also needs height, weight and BMR, which are derived for every
+# grid profile from a reference height per gender, weight = BMI * height^2
+# and the Mifflin-St Jeor BMR equation.
+DEFAULT_GRID = {
+    "age": {"min": 18, "max": 80, "step": 2},
+    "bmi": {"min": 16, "max": 40, "step": 1},
+    "activity_level": [1.2, 1.375, 1.55, 1.725, 1.9],
+    "gender": ["F", "M"],
+    "reference_height": {"F": 1.63, "M": 1.77},
+}
+
+FEATURES = ['age', 'weight(kg)', 'height(m)', 'BMI', 'BMR', 'activity_level', 'gender_F', 'gender_M']
+
+
+def feature_frame(age, weight, height, bmi, bmr, activity_level, gender):
+    """Model input for one or more profiles; every argument is a scalar or an equally long sequence."""
+    gender = np.asarray(gender)
+    return pd.DataFrame({
+        'age': age,
+        'weight(kg)': weight,
+        'height(m)': height,
+        'BMI': bmi,
+        'BMR': bmr,
+        'activity_level': activity_level,
+        'gender_F': (gender == "F").astype(int),
+        'gender_M': (gender == "M").astype(int),
+    }, index=np.arange(gender.size))[FEATURES]
+
+
+def load_grid(path=MEAL_PLAN_GRID):
+    if not path:
+        return DEFAULT_GRID
+    with open(path) as f:
+        return dict(DEFAULT_GRID, **json.load(f))
+
+
+def _band_values(band):
+    return np.round(np.arange(band["min"], band["max"] + band["step"] / 2, band["step"]), 6)
+
+
+def grid_profiles(grid=DEFAULT_GRID):
+    """
+    Model input of every grid profile, in the order of the table axes
+    (age, BMI, activity level, gender).
+    """
+    ages, bmis = _band_values(grid["age"]), _band_values(grid["bmi"])
+    rows = list(itertools.product(ages, bmis, grid["activity_level"], grid["gender"]))
+    age, bmi, activity_level, gender = (np.array(column) for column in zip(*rows))
+
+    height = np.array([grid["reference_height"][g] for g in gender])
+    weight = bmi * height ** 2
+    bmr = 10 * weight + 6.25 * height * 100 - 5 * age + np.where(gender == "M", 5, -161)
+    return feature_frame(age, weight, height, bmi, bmr, activity_level, gender)
+
+
+def table_path(grid=DEFAULT_GRID, model_path=MODEL_PATH, cache_root=CACHE_ROOT):
+    """Table location for a grid and a version of the model file."""
+    stat = os.stat(model_path)
+    key = json.dumps({"grid": grid, "model": [os.path.abspath(model_path), stat.st_size, stat.st_mtime_ns]},
+                     sort_keys=True)
+    return os.path.join(cache_root, hashlib.sha1(key.encode()).hexdigest()[:16])
+
+
+def build_table(model, grid=DEFAULT_GRID, model_path=MODEL_PATH, cache_root=CACHE_ROOT):
+    """
+    Score every grid profile with the model in one batch and store the
+    predicted calories as a table indexed by (age, BMI, activity level, gender).
+
+    Written to a temporary directory and renamed into place like the
+    nutrition cache, so concurrent workers never read a partial table.
+
+    Returns:
+        str: Path of the table directory
+    """
+    path = table_path(grid, model_path, cache_root)
+    if os.path.exists(os.path.join(path, "grid.json")):
+        return path
+
+    shape = (len(_band_values(grid["age"])), len(_band_values(grid["bmi"])),
+             len(grid["activity_level"]), len(grid["gender"]))
+    calories = np.asarray(model.predict(grid_profiles(grid)), dtype=np.float64).reshape(shape)
+
+    os.makedirs(cache_root, exist_ok=True)
+    build_dir = tempfile.mkdtemp(prefix=".build-", dir=cache_root)
+    np.save(os.path.join(build_dir, "calories.npy"), calories)
+    # grid.json is written last and marks the table as complete
+    with open(os.path.join(build_dir, "grid.json"), "w") as f:
+        json.dump(grid, f)
+
+    try:
+        os.rename(build_dir, path)
+    except OSError:
+        # Another worker finished the same table first
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+    # Drop tables built for previous models or grids
+    for entry in os.listdir(cache_root):
+        entry_path = os.path.join(cache_root, entry)
+        if entry_path != path and not entry.startswith(".build-") and os.path.isdir(entry_path):
+            shutil.rmtree(entry_path, ignore_errors=True)
+
+    return path
+
+
+class ProfileTable:
+    """Predicted calories of the grid profiles, looked up by quantized request."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "grid.json")) as f:
+            self.grid = json.load(f)
+        self.calories = np.load(os.path.join(path, "calories.npy"))
+        self._activity_levels = np.asarray(self.grid["activity_level"], dtype=np.float64)
+
+    def _band_index(self, band, value):
+        index = int(round((value - band["min"]) / band["step"]))
+        count = len(_band_values(band))
+        return index if 0 <= index < count else None
+
+    def lookup(self, age, bmi, activity_level, gender):
+        """Predicted calories of the request's profile, or None if it is outside the grid."""
+        age_index = self._band_index(self.grid["age"], age)
+        bmi_index = self._band_index(self.grid["bmi"], bmi)
+        activity_matches = np.flatnonzero(np.isclose(self._activity_levels, activity_level))
+        if age_index is None or bmi_index is None or not len(activity_matches) or gender not in self.grid["gender"]:
+            return None
+        return float(self.calories[age_index, bmi_index, activity_matches[0], self.grid["gender"].index(gender)])
+
+    def lookup_many(self, age, bmi, activity_level, gender):
+        """Vectorized lookup; NaN for requests outside the grid."""
+        indices = []
+        valid = np.ones(len(age), dtype=bool)
+        for band, values in ((self.grid["age"], age), (self.grid["bmi"], bmi)):
+            # np.rint rounds half to even like round() in lookup
+            index = np.rint((np.asarray(values, dtype=np.float64) - band["min"]) / band["step"]).astype(np.int64)
+            valid &= (index >= 0) & (index < len(_band_values(band)))
+            indices.append(index)
+
+        activity_matches = np.isclose(np.asarray(activity_level, dtype=np.float64)[:, None], self._activity_levels)
+        valid &= activity_matches.any(axis=1)
+        gender_index = pd.Index(self.grid["gender"]).get_indexer(np.asarray(gender))
+        valid &= gender_index >= 0
+
+        calories = np.full(len(valid), np.nan)
+        calories[valid] = self.calories[indices[0][valid], indices[1][valid],
+                                        activity_matches.argmax(axis=1)[valid], gender_index[valid]]
+        return calories
+
+
+class MealPlanCache:
+    """
+    LRU of complete responses for exact repeats, plus hit counters.
+
+    Every request is counted by where its answer came from: ``lru`` (an
+    exact repeat), ``table`` (the precomputed profile table) or ``live``
+    (the model).
+    """
+
+    def __init__(self, max_size=MEAL_PLAN_LRU_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"lru": 0, "table": 0, "live": 0}
+
+    def get(self, key):
+        with self._lock:
+            response = self._entries.get(key)
+            if response is not None:
+                self._entries.move_to_end(key)
+                self._counts["lru"] += 1
+            return response
+
+    def put(self, key, response, source):
+        """Store a response computed from ``source`` (``table`` or ``live``)."""
+        with self._lock:
+            self._counts[source] += 1
+            if self.max_size <= 0:
+                return
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = sum(self._counts.values())
+            return {
+                "requests": total,
+                "lru_hits": self._counts["lru"],
+                "table_hits": self._counts["table"],
+                "live_predictions": self._counts["live"],
+                "lru_hit_rate": self._counts["lru"] / total if total else 0.0,
+                "table_hit_rate": self._counts["table"] / total if total else 0.0,
+                "lru_size": len(self._entries),
+            }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("Usage: python meal_plan_cache.py build [grid.json]")
+        sys.exit(1)
+
+    import joblib
+    grid = load_grid(sys.argv[2] if len(sys.argv) > 2 else MEAL_PLAN_GRID)
+    print(f"Meal plan profile table ready at {build_table(joblib.load(MODEL_PATH), grid)}")
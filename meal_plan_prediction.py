@@ -1,37 +1,135 @@
-import joblib
-import pandas as pd 
-
-
-model = joblib.load('models/meal_plan_prediction_model.joblib')
-df = pd.read_excel("nutrition.xlsx")
-
-
-def predict_meal_plan(age, weight, height, bmi, bmr, activity_level, gender , number_of_meals , number_of_options):
-    # Set gender encoding based on input
-    gender_F = 1 if gender == "F" else 0
-    gender_M = 1 if gender == "M" else 0
-    
-    user_inputs = {
-        'age': age,
-        'weight(kg)': weight,
-        'height(m)': height,
-        'BMI': bmi,
-        'BMR': bmr,
-        'activity_level': activity_level,
-        'gender_F': gender_F,
-        'gender_M': gender_M,
-    }
-    # Convert user input to DataFrame
-    user_df = pd.DataFrame([user_inputs])
-
-    # Make prediction
-    predicted_calories = model.predict(user_df)
-    
-    suggested_meals = df[df['calories']<predicted_calories[0]/number_of_meals].head(number_of_options)
-    suggested_meals = suggested_meals.fillna('')
-    suggested_meals_list = suggested_meals.to_dict(orient='records')
-
-    return {"total_calories":round(predicted_calories[0] , 2) , "calories_per_meal":round(predicted_calories[0]/number_of_meals , 2) , "suggested":suggested_meals_list}
+import threading
+import numpy as np
+from model_registry import registry
+from nutrition_index import NutritionIndex
+from nutrition_store import NutritionTable, build_cache, cache_path
+from metrics import MEAL_PLAN_REQUESTS, timed
+from meal_plan_cache import (MODEL_PATH, MEAL_PLAN_PRECOMPUTE, MealPlanCache, ProfileTable, build_table,
+                             feature_frame, load_grid, table_path)
+
+_nutrition_index = None
+_nutrition_index_path = None
+_nutrition_index_lock = threading.Lock()
+
+meal_plan_cache = MealPlanCache()
+
+_model = None
+# Bumped on every model reload; part of the LRU key so responses of an older model are never returned
+_model_generation = 0
+_model_lock = threading.Lock()
+
+_profile_table = None
+_profile_table_path = None
+_profile_table_lock = threading.Lock()
+
+
+def get_nutrition_index():
+    """
+    Open the nutrition cache on first use.
+    The cache is rebuilt and reopened automatically when nutrition.xlsx changes.
+    """
+    global _nutrition_index, _nutrition_index_path
+    path = cache_path()
+    if _nutrition_index is None or _nutrition_index_path != path:
+        with _nutrition_index_lock:
+            if _nutrition_index is None or _nutrition_index_path != path:
+                _nutrition_index = NutritionIndex.from_table(NutritionTable(build_cache()))
+                _nutrition_index_path = path
+                # Cached responses list meals from the previous workbook
+                meal_plan_cache.clear()
+    return _nutrition_index
+
+
+def get_model():
+    """
+    The meal plan model, loaded on first use and reloaded when the file changes (see model_registry).
+    Cached responses were computed by the previous model, so a reload clears them.
+    """
+    return _current_model()[0]
+
+
+def _current_model():
+    global _model, _model_generation
+    model = registry.get(MODEL_PATH)
+    with _model_lock:
+        if model is not _model:
+            if _model is not None:
+                _model_generation += 1
+                meal_plan_cache.clear()
+            _model = model
+        return model, _model_generation
+
+
+def get_profile_table():
+    """
+    Load the precomputed profile table on first use, building it if needed.
+    The table is rebuilt and reloaded automatically when the model file changes.
+    """
+    global _profile_table, _profile_table_path
+    grid = load_grid()
+    path = table_path(grid)
+    if _profile_table is None or _profile_table_path != path:
+        with _profile_table_lock:
+            if _profile_table is None or _profile_table_path != path:
+                _profile_table = ProfileTable(build_table(get_model(), grid))
+                _profile_table_path = path
+    return _profile_table
+
+
+def predict_calories(age, weight, height, bmi, bmr, activity_level, gender):
+    """
+    Daily calories of many users at once, as predict_meal_plan computes them
+    for one: from the profile table when MEAL_PLAN_PRECOMPUTE=1 and the user
+    is on the grid, otherwise from a single model call over all the others.
+
+    Args:
+        age, weight, height, bmi, bmr, activity_level, gender (array-like): One value per user
+
+    Returns:
+        np.ndarray: Calories of every user
+    """
+    calories = np.full(len(gender), np.nan)
+    if MEAL_PLAN_PRECOMPUTE:
+        calories = get_profile_table().lookup_many(age, bmi, activity_level, gender)
+    live = np.flatnonzero(np.isnan(calories))
+    if live.size:
+        columns = [np.asarray(values)[live] for values in (age, weight, height, bmi, bmr, activity_level, gender)]
+        calories[live] = get_model().predict(feature_frame(*columns))
+    return calories
+
+
+@timed("meal_plan_prediction")
+def predict_meal_plan(age, weight, height, bmi, bmr, activity_level, gender , number_of_meals , number_of_options, selection="first"):
+    """
+    Predict the daily calories of a user and suggest meals below the per-meal budget.
+
+    Exact repeats of a request are answered from an in-process LRU. With
+    MEAL_PLAN_PRECOMPUTE=1, users whose age, BMI band, activity level and
+    gender fall on the precomputed profile grid get the calories of that grid
+    profile instead of a model prediction (see meal_plan_cache); everyone
+    else falls back to the model.
+    """
+    model, generation = _current_model()
+    key = (generation, age, weight, height, bmi, bmr, activity_level, gender, number_of_meals, number_of_options, selection)
+    index = get_nutrition_index()
+    cached = meal_plan_cache.get(key)
+    if cached is not None:
+        MEAL_PLAN_REQUESTS.labels("lru").inc()
+        return cached
+
+    calories = get_profile_table().lookup(age, bmi, activity_level, gender) if MEAL_PLAN_PRECOMPUTE else None
+    source = "table"
+    if calories is None:
+        # Make prediction
+        calories = float(model.predict(feature_frame(age, weight, height, bmi, bmr, activity_level, gender))[0])
+        source = "live"
+
+    suggested_meals_list = index.below(calories/number_of_meals, number_of_options, selection=selection)
+
+    response = {"total_calories":round(calories , 2) , "calories_per_meal":round(calories/number_of_meals , 2) , "suggested":suggested_meals_list}
+    meal_plan_cache.put(key, response, source)
+    MEAL_PLAN_REQUESTS.labels(source).inc()
+    return response
     
 
 
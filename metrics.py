@@ -0,0 +1,91 @@
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, values
+
+
+METRICS_ROOT = os.environ.get("METRICS_DIR", ".cache/metrics")
+
+
+def _remove_stale_dirs(root):
+    # Directories of server processes that are no longer running
+    for entry in os.listdir(root):
+        if not entry.isdigit():
+            continue
+        try:
+            os.kill(int(entry), 0)
+        except ProcessLookupError:
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+        except PermissionError:
+            pass
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests handled", ["method", "route", "status"])
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+                         buckets=LATENCY_BUCKETS)
+STAGE_LATENCY = Histogram("stage_duration_seconds", "Time spent in each processing stage", ["stage"],
+                          buckets=LATENCY_BUCKETS)
+STAGE_ERRORS = Counter("stage_errors_total", "Processing stages that raised", ["stage"])
+S3_BYTES = Counter("s3_transfer_bytes_total", "Bytes transferred to and from S3", ["direction"])
+MEAL_PLAN_REQUESTS = Counter("meal_plan_requests_total", "Meal plan requests by where the answer came from",
+                             ["source"])
+
+
+@contextmanager
+def timed(stage, **fields):
+    """
+    Time a processing stage into ``stage_duration_seconds`` and log its duration.
+
+    Works as a context manager and as a decorator. Extra keyword arguments
+    are added to the log record.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_LATENCY.labels(stage).observe(seconds)
+        logger.info("stage finished", extra={"stage": stage, "seconds": round(seconds, 4), **fields})
+
+
+def setup_multiprocess_dir(root=METRICS_ROOT):
+    """
+    Point PROMETHEUS_MULTIPROC_DIR at a metrics directory for this server.
+
+    Pose workers and job workers run in separate processes. Every process
+    writes its samples to files in one directory per server process and
+    /metrics merges them; worker processes inherit the variable from the
+    server. An existing PROMETHEUS_MULTIPROC_DIR is kept, so gunicorn's
+    workers use the directory set up by the master. Call it in the server
+    process before any metric records a sample.
+
+    Returns:
+        str: The metrics directory
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        os.makedirs(root, exist_ok=True)
+        _remove_stale_dirs(root)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.abspath(os.path.join(root, str(os.getpid())))
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+    # prometheus_client chose single-process values if it was imported before
+    # the variable was set. Every metric here has labels and only creates its
+    # values when a label set is first used, so choosing again covers them all
+    values.ValueClass = values.get_value_class()
+    return os.environ["PROMETHEUS_MULTIPROC_DIR"]
+
+
+def render():
+    """Samples of every process in the Prometheus text format, and its content type."""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
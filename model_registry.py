@@ -0,0 +1,102 @@
+import logging
+import os
+import pickle
+import threading
+import time
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Process-level cache of joblib models.
+
+    Models are loaded lazily on first use (or eagerly through ``preload``) and
+    shared by every request handled by the process. A model is reloaded
+    transparently when the modification time of its file changes, so a new
+    model can be dropped into ``models/`` without restarting the workers.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """
+        Return the model stored at ``path``, loading or reloading it if needed.
+
+        Args:
+            path (str): Path to a ``.joblib`` file
+
+        Returns:
+            The deserialized model
+        """
+        path = os.path.abspath(path)
+        mtime = os.path.getmtime(path)
+
+        entry = self._models.get(path)
+        if entry is not None and entry["mtime"] == mtime:
+            return entry["model"]
+
+        with self._lock:
+            # Another thread may have loaded the model while we were waiting
+            entry = self._models.get(path)
+            if entry is not None and entry["mtime"] == mtime:
+                return entry["model"]
+
+            model, load_seconds, memory_bytes = self._load(path)
+            self._models[path] = {
+                "model": model,
+                "mtime": mtime,
+                "load_seconds": load_seconds,
+                "memory_bytes": memory_bytes,
+                "loaded_at": time.time(),
+                "reloads": 0 if entry is None else entry["reloads"] + 1,
+            }
+            return model
+
+    def preload(self, paths):
+        """Load every model in ``paths`` up front, e.g. at application startup."""
+        for path in paths:
+            self.get(path)
+
+    def stats(self):
+        """
+        Report load time and memory for every cached model.
+
+        Returns:
+            dict: Model path mapped to its load statistics
+        """
+        return {
+            path: {key: value for key, value in entry.items() if key != "model"}
+            for path, entry in self._models.items()
+        }
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    @staticmethod
+    def _load(path):
+        start = time.perf_counter()
+        model = joblib.load(path)
+        load_seconds = time.perf_counter() - start
+
+        logger.info("Loaded model", extra={"model": path, "seconds": round(load_seconds, 3)})
+        return model, load_seconds, ModelRegistry._model_bytes(model)
+
+    @staticmethod
+    def _model_bytes(model):
+        # Memory is estimated as the size of the model's pickle with numpy
+        # buffers passed out of band, which counts estimator arrays without
+        # copying them. (Tracing the load with tracemalloc also traces the
+        # scikit-learn imports the first load triggers and slowed worker
+        # startup several fold.)
+        buffers = []
+        size = len(pickle.dumps(model, protocol=5, buffer_callback=buffers.append))
+        return size + sum(buffer.raw().nbytes for buffer in buffers)
+
+
+registry = ModelRegistry()
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+
+SELECTIONS = ("first", "closest", "diverse")
+
+
+class NutritionIndex:
+    """
+    Calorie-keyed index over the nutrition table.
+
+    The table is sorted by calories once at load time and every row is
+    serialized to a record dictionary only once, so a query is a binary search
+    plus a slice of ready-made records. Records are shared between queries and
+    must not be mutated by callers.
+    """
+
+    def __init__(self, calories, records):
+        """
+        Args:
+            calories (array-like): Calories of every row, in file order
+            records (sequence): Serialized record of every row, in file order.
+                Either a list or a lazily serializing sequence such as
+                ``nutrition_store.NutritionTable``
+        """
+        calories = np.asarray(calories, dtype=np.float64)
+        # Rows without a calorie value never match a calorie limit
+        positions = np.flatnonzero(~np.isnan(calories))
+        order = positions[np.argsort(calories[positions], kind="stable")]
+
+        self._order = order
+        self._calories = calories[order]
+        self._records = records
+
+    @classmethod
+    def from_dataframe(cls, df):
+        calories = pd.to_numeric(df["calories"], errors="coerce").to_numpy(dtype=np.float64)
+        records = df.fillna("").to_dict(orient="records")
+        return cls(calories, records)
+
+    @classmethod
+    def from_table(cls, table):
+        return cls(table.column("calories"), table)
+
+    def record(self, position):
+        """Record of the row at ``position`` in file order, as returned by ``positions_below``."""
+        return self._records[position]
+
+    def __len__(self):
+        return len(self._order)
+
+    def below(self, limit, count, selection="first"):
+        """
+        Return up to ``count`` records with fewer calories than ``limit``.
+
+        Args:
+            limit (float): Exclusive calorie limit
+            count (int): Maximum number of records to return
+            selection (str): "first" keeps the table's file order, "closest"
+                returns the records nearest to the limit (highest calories
+                first) and "diverse" spreads the picks evenly over the calorie
+                range below the limit
+
+        Returns:
+            list: Record dictionaries
+        """
+        return [self._records[i] for i in self.positions_below(limit, count, selection)]
+
+    def count_below(self, limits):
+        """
+        Number of rows with fewer calories than each limit. Limits with the
+        same number of rows below them select the same rows.
+
+        Args:
+            limits (array-like): Exclusive calorie limits
+
+        Returns:
+            np.ndarray: Row count of every limit
+        """
+        return np.searchsorted(self._calories, limits, side="left")
+
+    def positions_below(self, limit, count, selection="first"):
+        """
+        Same as ``below``, but returns the rows' positions in the table
+        instead of their records.
+
+        Returns:
+            np.ndarray: Row positions
+        """
+        if selection not in SELECTIONS:
+            raise ValueError(f"Unknown selection '{selection}', expected one of {SELECTIONS}")
+
+        # Number of rows with calories strictly below the limit
+        matches = int(self.count_below(limit))
+        count = min(max(int(count), 0), matches)
+        if count == 0:
+            return self._order[:0]
+
+        if selection == "closest":
+            return self._order[matches - count:matches][::-1]
+
+        if selection == "diverse":
+            picks = np.linspace(0, matches - 1, count).round().astype(np.intp)
+            return self._order[picks]
+
+        # The first rows in file order are the smallest file positions among the matches
+        positions = self._order[:matches]
+        if count < matches:
+            positions = np.partition(positions, count - 1)[:count]
+        return np.sort(positions)
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+
+SOURCE_PATH = "nutrition.xlsx"
+CACHE_ROOT = os.environ.get("NUTRITION_CACHE_DIR", ".cache/nutrition")
+
+# Value kinds of text columns, which can mix strings with numbers in the workbook
+KIND_STR = 0
+KIND_INT = 1
+KIND_FLOAT = 2
+KIND_MISSING = 3
+
+
+def fingerprint(source_path):
+    """Identify a version of the workbook by its size and modification time."""
+    stat = os.stat(source_path)
+    key = f"{os.path.abspath(source_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def cache_path(source_path=SOURCE_PATH, cache_root=CACHE_ROOT):
+    return os.path.join(cache_root, fingerprint(source_path))
+
+
+def _encode_text_column(values):
+    kinds = np.empty(len(values), dtype=np.int8)
+    text = []
+    for i, value in enumerate(values):
+        if isinstance(value, str):
+            kinds[i] = KIND_STR
+        elif isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+            kinds[i] = KIND_INT
+        elif isinstance(value, (float, np.floating)):
+            kinds[i] = KIND_MISSING if np.isnan(value) else KIND_FLOAT
+        elif value is None:
+            kinds[i] = KIND_MISSING
+        else:
+            kinds[i] = KIND_STR
+        text.append("" if kinds[i] == KIND_MISSING else str(value))
+    return np.array(text, dtype=str), kinds
+
+
+def build_cache(source_path=SOURCE_PATH, cache_root=CACHE_ROOT):
+    """
+    Convert the nutrition workbook into a directory of memory-mappable ``.npy`` columns.
+
+    Numeric columns are stored with their native dtype. Text columns are
+    stored as fixed-width unicode arrays plus a kind array, so mixed cells
+    (e.g. ``0`` in a column of ``"9.00 mg"`` strings) keep their type.
+    The cache is written to a temporary directory and renamed into place, so
+    concurrent workers never see a partial cache.
+
+    Returns:
+        str: Path to the cache directory
+    """
+    import pandas as pd
+
+    target = cache_path(source_path, cache_root)
+    if os.path.exists(os.path.join(target, "schema.json")):
+        return target
+
+    os.makedirs(cache_root, exist_ok=True)
+    df = pd.read_excel(source_path)
+
+    build_dir = tempfile.mkdtemp(prefix=".build-", dir=cache_root)
+    columns = []
+    for position, name in enumerate(df.columns):
+        series = df[name]
+        if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            filename = f"{position:03d}.npy"
+            np.save(os.path.join(build_dir, filename), series.to_numpy())
+            columns.append({"name": str(name), "type": "numeric", "values": filename})
+        else:
+            text, kinds = _encode_text_column(series.tolist())
+            values_file = f"{position:03d}.npy"
+            kinds_file = f"{position:03d}.kinds.npy"
+            np.save(os.path.join(build_dir, values_file), text)
+            np.save(os.path.join(build_dir, kinds_file), kinds)
+            columns.append({"name": str(name), "type": "text", "values": values_file, "kinds": kinds_file})
+
+    # schema.json is written last and marks the cache as complete
+    with open(os.path.join(build_dir, "schema.json"), "w") as f:
+        json.dump({"source": os.path.abspath(source_path), "rows": len(df), "columns": columns}, f)
+
+    try:
+        os.rename(build_dir, target)
+    except OSError:
+        # Another worker finished the same cache first
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+    # Drop caches built from previous versions of the workbook
+    for entry in os.listdir(cache_root):
+        path = os.path.join(cache_root, entry)
+        if path != target and not entry.startswith(".build-") and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+    return target
+
+
+class NutritionTable:
+    """
+    Read-only view of a nutrition cache.
+
+    Columns are memory-mapped, so every worker process shares the same pages.
+    Rows are converted to record dictionaries on first access and memoized;
+    values match ``df.fillna('').to_dict(orient='records')``.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "schema.json")) as f:
+            schema = json.load(f)
+
+        self.path = path
+        self.rows = schema["rows"]
+        self.columns = [column["name"] for column in schema["columns"]]
+        self._columns = []
+        for column in schema["columns"]:
+            values = np.load(os.path.join(path, column["values"]), mmap_mode="r")
+            kinds = None
+            if column["type"] == "text":
+                kinds = np.load(os.path.join(path, column["kinds"]), mmap_mode="r")
+            self._columns.append((column["name"], values, kinds))
+        self._records = {}
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name):
+        for column_name, values, _ in self._columns:
+            if column_name == name:
+                return values
+        raise KeyError(name)
+
+    def __getitem__(self, index):
+        record = self._records.get(index)
+        if record is None:
+            record = {name: self._value(values, kinds, index) for name, values, kinds in self._columns}
+            self._records[index] = record
+        return record
+
+    @staticmethod
+    def _value(values, kinds, index):
+        if kinds is None:
+            value = values[index].item()
+            if isinstance(value, float) and value != value:
+                return ""
+            return value
+
+        kind = kinds[index]
+        if kind == KIND_MISSING:
+            return ""
+        text = str(values[index])
+        if kind == KIND_INT:
+            return int(text)
+        if kind == KIND_FLOAT:
+            return float(text)
+        return text
+
+
+def open_table(source_path=SOURCE_PATH, cache_root=CACHE_ROOT):
+    """Open the nutrition cache, rebuilding it first if the workbook changed."""
+    return NutritionTable(build_cache(source_path, cache_root))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("Usage: python nutrition_store.py build [source.xlsx]")
+        sys.exit(1)
+
+    source = sys.argv[2] if len(sys.argv) > 2 else SOURCE_PATH
+    print(f"Nutrition cache ready at {build_cache(source)}")
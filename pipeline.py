@@ -0,0 +1,211 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from joints import DEFAULT_JOINT, joint_angles, validate_joints
+from pose_backends import POSE_BACKEND, POSE_COMPLEXITY
+from result_cache import file_digest, get_result_cache
+from workspace import Workspace
+
+logger = logging.getLogger(__name__)
+
+# Parameters that change the pose pipeline's output; part of every cache key.
+# POSE_STRIDE / POSE_TARGET_FPS / POSE_MAX_SIDE trade accuracy for speed (see track_video)
+PIPELINE_PARAMS = {
+    "fps": 15,
+    "stride": int(os.environ.get("POSE_STRIDE", 1)),
+    "target_fps": float(os.environ["POSE_TARGET_FPS"]) if os.environ.get("POSE_TARGET_FPS") else None,
+    "max_side": int(os.environ["POSE_MAX_SIDE"]) if os.environ.get("POSE_MAX_SIDE") else None,
+    # POSE_BACKEND / POSE_COMPLEXITY pick the inference engine and model (see pose_backends)
+    "backend": POSE_BACKEND,
+    "complexity": POSE_COMPLEXITY,
+}
+
+
+def run_sport_analysis(correct_video, incorrect_video, joints=None, similarity_method=None, outputs=None,
+                       progress=None):
+    """
+    Download both videos, compare them and upload the generated artifacts.
+
+    Args:
+        correct_video (str): URL of the video with correct technique
+        incorrect_video (str): URL of the video with wrong technique
+        joints (list): Joints to compare, names from joints.JOINTS; the first
+            one is used for the comparison video and graph. Defaults to the
+            left elbow
+        similarity_method (str): ``dtw``, ``resample`` or ``cosine``, see
+            similarity.compare_series. Defaults to SIMILARITY_METHOD
+        outputs (list): Artifacts to generate and upload, any of
+            sport_analysis.OUTPUTS; defaults to all of them. An empty list
+            computes the similarity only
+        progress (callable): Optional callback receiving the name of each stage
+            as it starts
+
+    Returns:
+        dict: URLs of the uploaded artifacts (None for outputs that were not
+            requested), the similarity percentage of the
+            first joint and ``joints``, the similarity percentage of every joint
+
+    Results are cached by video content (see result_cache): a video that was
+    analyzed before skips decoding and pose estimation and reuses its uploaded
+    pose video, and a repeated pair returns the stored response directly.
+    The full pose is cached, so comparing other joints of a video that was
+    analyzed before does not run pose estimation again.
+
+    Raises:
+        ValueError: If a joint name, the similarity method or an output is unknown
+    """
+    # The video stack (cv2, mediapipe, matplotlib, moviepy, scipy, boto3) is
+    # imported on the first analysis, so processes that only serve the
+    # prediction routes never load it
+    from s3_download import download_s3_file
+    from s3_upload import upload_to_s3
+    from s3_transfer import get_executor
+    from sport_analysis import process_videos, compare_arm_angles, joint_similarities, validate_outputs
+    from similarity import SIMILARITY_METHOD
+
+    joints = validate_joints(joints or [DEFAULT_JOINT])
+    similarity_method = similarity_method or SIMILARITY_METHOD
+    outputs = validate_outputs(outputs)
+    pose_videos = "pose_videos" in outputs
+
+    def report(stage):
+        if progress is not None:
+            progress(stage)
+
+    # Every analysis gets its own scratch folder and object keys, so
+    # concurrent analyses in the same process never touch each other's files
+    with Workspace() as workspace:
+        # Both inputs are fetched at once and each split of the quota is fixed up front
+        max_video_bytes = workspace.remaining() // 2 if workspace.quota_bytes is not None else None
+
+        cache = get_result_cache()
+
+        def fetch_and_process(url, name, pose_output):
+            video_path = download_s3_file(url=url, output_path=workspace.file(name), max_bytes=max_video_bytes)
+            if not video_path:
+                raise RuntimeError(f"Could not download {url}")
+            digest = file_digest(video_path)
+
+            cached = cache.get_video(digest, **PIPELINE_PARAMS)
+            if cached is not None and (cached["pose_video_url"] or not pose_videos):
+                logger.info("Using cached pose analysis", extra={"url": url})
+                return digest, cached["landmarks"], cached["pose_video_url"]
+
+            report("analyzing")
+            track = process_videos([(video_path, pose_output)], **PIPELINE_PARAMS)[0]
+            cache.put_video(digest, track["angles"], track["landmarks"], **PIPELINE_PARAMS)
+            return digest, track["landmarks"], None
+
+        # Pose estimation of whichever video arrives first starts while the
+        # other one is still downloading
+        report("downloading")
+        correct_pose_output = workspace.file("correct_pose_analysis.mp4") if pose_videos else None
+        wrong_pose_output = workspace.file("wrong_pose_analysis.mp4") if pose_videos else None
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            correct_future = pool.submit(fetch_and_process, correct_video, "correct_video.mp4", correct_pose_output)
+            wrong_future = pool.submit(fetch_and_process, incorrect_video, "incorrect_video.mp4", wrong_pose_output)
+            correct_digest, correct_landmarks, correct_video_url = correct_future.result()
+            wrong_digest, wrong_landmarks, wrong_video_url = wrong_future.result()
+
+        pair_params = dict(PIPELINE_PARAMS, joints=joints, similarity_method=similarity_method, outputs=sorted(outputs))
+        cached_pair = cache.get_pair(correct_digest, wrong_digest, **pair_params)
+        if cached_pair is not None:
+            logger.info("Using cached analysis for this video pair")
+            return cached_pair
+
+        primary_joint = joints[0]
+        result = compare_arm_angles(
+            joint_angles(correct_landmarks, [primary_joint])[primary_joint].tolist(),
+            joint_angles(wrong_landmarks, [primary_joint])[primary_joint].tolist(),
+            output_folder=workspace.path,
+            method=similarity_method,
+            outputs=outputs
+        )
+        workspace.check_quota()
+
+        report("uploading")
+
+        def upload(path):
+            if path is None:
+                return None
+            return get_executor().submit(upload_to_s3, file_path=path, key=workspace.key(os.path.basename(path)))
+
+        if not pose_videos:
+            correct_video_url = wrong_video_url = None
+        # Pose videos already uploaded by an earlier analysis are reused
+        correct_upload = upload(correct_pose_output) if correct_video_url is None else None
+        wrong_upload = upload(wrong_pose_output) if wrong_video_url is None else None
+        angle_comparison_upload = upload(result['angle_comparison_video'])
+        final_graph_upload = upload(result['final_graph'])
+
+        if correct_upload is not None:
+            correct_video_url = correct_upload.result()
+            cache.set_video_url(correct_digest, correct_video_url, **PIPELINE_PARAMS)
+        if wrong_upload is not None:
+            wrong_video_url = wrong_upload.result()
+            cache.set_video_url(wrong_digest, wrong_video_url, **PIPELINE_PARAMS)
+
+        response = {
+            "correct_video": correct_video_url ,
+            "wrong_video": wrong_video_url ,
+            "angle_comparison_video": angle_comparison_upload.result() if angle_comparison_upload else None,
+            "final_graph": final_graph_upload.result() if final_graph_upload else None,
+            "similarity" : result['similarity_percentage'],
+            "joints": joint_similarities(correct_landmarks, wrong_landmarks, joints, method=similarity_method)
+        }
+        cache.put_pair(correct_digest, wrong_digest, response, **pair_params)
+
+    return response
+
+
+def run_rep_analysis(correct_video, incorrect_video, joint=DEFAULT_JOINT, similarity_method=None, progress=None):
+    """
+    Download both videos and score every rep of the wrong one against a typical rep of the correct one.
+
+    Reps are reported while the wrong video is still being analyzed: after
+    every completed rep, ``progress`` receives the ``analyzing`` stage and
+    the reps so far, so a job over a long session shows its results as they
+    come in (see sport_analysis.analyze_reps).
+
+    Args:
+        correct_video (str): URL of the video with correct technique
+        incorrect_video (str): URL of the video to score, e.g. a long training session
+        joint (str): Joint to measure, a name from joints.JOINTS
+        similarity_method (str): See run_sport_analysis
+        progress (callable): Optional callback receiving the name of each
+            stage and, while analyzing, the partial result
+
+    Returns:
+        dict: sport_analysis.analyze_reps result
+    """
+    from s3_download import download_s3_file
+    from sport_analysis import analyze_reps
+    from similarity import SIMILARITY_METHOD
+
+    joint = validate_joints([joint])[0]
+    similarity_method = similarity_method or SIMILARITY_METHOD
+
+    def report(stage, result=None):
+        if progress is not None:
+            progress(stage, result)
+
+    with Workspace() as workspace:
+        max_video_bytes = workspace.remaining() // 2 if workspace.quota_bytes is not None else None
+        report("downloading")
+        paths = []
+        for url, name in ((correct_video, "correct_video.mp4"), (incorrect_video, "incorrect_video.mp4")):
+            path = download_s3_file(url=url, output_path=workspace.file(name), max_bytes=max_video_bytes)
+            if not path:
+                raise RuntimeError(f"Could not download {url}")
+            paths.append(path)
+
+        report("analyzing")
+        reps = []
+
+        def on_rep(rep):
+            reps.append(rep)
+            report("analyzing", {"reps": reps, "count": len(reps)})
+
+        options = {key: PIPELINE_PARAMS[key] for key in ("stride", "target_fps", "max_side", "backend", "complexity")}
+        return analyze_reps(paths[0], paths[1], joint=joint, method=similarity_method, on_rep=on_rep, **options)
@@ -0,0 +1,208 @@
+import abc
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from joints import NUM_LANDMARKS, LANDMARK_FIELDS
+
+
+# lite / full / heavy trade accuracy for speed, in that order
+COMPLEXITIES = {"lite": 0, "full": 1, "heavy": 2}
+POSE_BACKEND = os.environ.get("POSE_BACKEND", "mediapipe")
+POSE_COMPLEXITY = os.environ.get("POSE_COMPLEXITY", "full")
+# Folder with pose_landmark_{lite,full,heavy}.onnx for the onnx backend
+POSE_ONNX_MODEL_DIR = os.environ.get("POSE_ONNX_MODEL_DIR", "models/pose")
+POSE_BATCH_SIZE = int(os.environ.get("POSE_BATCH_SIZE", 8))
+
+
+class PoseBackend(abc.ABC):
+    """
+    Pose inference engine used by track_video.
+
+    A backend turns RGB frames into landmark arrays of shape (33, 4) holding
+    the normalized x, y, z coordinates and the visibility of every MediaPipe
+    pose landmark, or None for frames without a pose. Frames are handed over
+    in batches of up to ``batch_size`` in video order; backends that track the
+    pose across frames keep that state until ``reset`` is called.
+    """
+
+    batch_size = 1
+
+    @abc.abstractmethod
+    def process_batch(self, images):
+        """Return the landmarks of every image, None where no pose was found."""
+
+    def reset(self):
+        """Forget tracking state before a new video."""
+
+    def warm_up(self, size=(256, 256)):
+        """Run one blank frame so model loading and allocation happen before the first video."""
+        self.process_batch([np.zeros((size[1], size[0], 3), dtype=np.uint8)])
+        self.reset()
+
+    def close(self):
+        pass
+
+
+class MediaPipeBackend(PoseBackend):
+    """
+    MediaPipe Pose, one frame at a time, with the tracker carried between frames.
+
+    Only the full model ships with the mediapipe package; lite and heavy are
+    downloaded into it on first use.
+    """
+
+    def __init__(self, complexity=POSE_COMPLEXITY, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        import mediapipe as mp
+
+        self.complexity = complexity
+        self._pose = mp.solutions.pose.Pose(
+            model_complexity=COMPLEXITIES[complexity],
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+        )
+
+    def process_batch(self, images):
+        results = []
+        for image in images:
+            pose_landmarks = self._pose.process(image).pose_landmarks
+            if pose_landmarks is None:
+                results.append(None)
+            else:
+                results.append(np.array(
+                    [(landmark.x, landmark.y, landmark.z, landmark.visibility) for landmark in pose_landmarks.landmark],
+                    dtype=np.float32))
+        return results
+
+    def reset(self):
+        self._pose.reset()
+
+    def close(self):
+        self._pose.close()
+
+
+class OnnxPoseBackend(PoseBackend):
+    """
+    BlazePose landmark model run with ONNX Runtime on the CPU, several frames per call.
+
+    Expects the MediaPipe pose landmark model converted to ONNX (for example
+    with tf2onnx), with a dynamic batch dimension and an NHWC or NCHW float
+    input in the 0-1 range. Its first output holds 5 values (x, y, z,
+    visibility, presence) per landmark in input pixels, an optional second
+    output the pose presence score. Frames are letterboxed to the model input
+    as a whole; there is no person detector or tracking crop, so this backend
+    suits videos framed around a single person. Requires ``onnxruntime``.
+    """
+
+    def __init__(self, complexity=POSE_COMPLEXITY, model_dir=POSE_ONNX_MODEL_DIR, batch_size=POSE_BATCH_SIZE,
+                 min_presence=0.5, threads=None):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("The onnx pose backend requires onnxruntime (pip install onnxruntime)") from e
+
+        if complexity not in COMPLEXITIES:
+            raise ValueError(f"Unknown pose complexity '{complexity}', expected one of {sorted(COMPLEXITIES)}")
+        self.complexity = complexity
+        self.batch_size = batch_size
+        self.min_presence = min_presence
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        model_path = os.path.join(model_dir, f"pose_landmark_{complexity}.onnx")
+        self._session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        self._channels_first = model_input.shape[1] == 3
+        self._input_size = tuple(model_input.shape[2:4] if self._channels_first else model_input.shape[1:3])
+
+    def process_batch(self, images):
+        import cv2
+
+        height, width = self._input_size
+        batch = np.zeros((len(images), height, width, 3), dtype=np.float32)
+        placements = []
+        for index, image in enumerate(images):
+            # Letterbox: keep the aspect ratio and pad the short side
+            scale = min(width / image.shape[1], height / image.shape[0])
+            scaled_width, scaled_height = round(image.shape[1] * scale), round(image.shape[0] * scale)
+            left, top = (width - scaled_width) // 2, (height - scaled_height) // 2
+            resized = cv2.resize(image, (scaled_width, scaled_height), interpolation=cv2.INTER_AREA)
+            batch[index, top:top + scaled_height, left:left + scaled_width] = resized / 255.0
+            placements.append((scale, left, top, image.shape[1], image.shape[0]))
+
+        if self._channels_first:
+            batch = batch.transpose(0, 3, 1, 2)
+        outputs = self._session.run(None, {self._input_name: batch})
+
+        raw = outputs[0].reshape(len(images), -1, 5)[:, :NUM_LANDMARKS]
+        pose_scores = _sigmoid(outputs[1].reshape(len(images), -1)[:, 0]) if len(outputs) > 1 else None
+
+        results = []
+        for index, (scale, left, top, image_width, image_height) in enumerate(placements):
+            if pose_scores is not None and pose_scores[index] < self.min_presence:
+                results.append(None)
+                continue
+            landmarks = np.empty((NUM_LANDMARKS, len(LANDMARK_FIELDS)), dtype=np.float32)
+            landmarks[:, 0] = (raw[index, :, 0] - left) / scale / image_width
+            landmarks[:, 1] = (raw[index, :, 1] - top) / scale / image_height
+            landmarks[:, 2] = raw[index, :, 2] / scale / image_width
+            landmarks[:, 3] = _sigmoid(raw[index, :, 3])
+            results.append(landmarks)
+        return results
+
+
+def _sigmoid(values):
+    return 1 / (1 + np.exp(-values))
+
+
+BACKENDS = {
+    "mediapipe": MediaPipeBackend,
+    "onnx": OnnxPoseBackend,
+}
+
+# Idle warmed-up backends of this process by (name, complexity)
+_idle_backends = {}
+_idle_backends_lock = threading.Lock()
+
+
+@contextmanager
+def pose_backend(name=POSE_BACKEND, complexity=POSE_COMPLEXITY):
+    """
+    Check out a warmed-up backend for one video.
+
+    Backends are pooled per process and handed back when the ``with`` block
+    exits, so the model is loaded and initialized once per concurrent user
+    rather than for every video, whichever thread runs the video; pose
+    workers and the short-lived threads of an in-process analysis alike
+    reuse them. A backend carries tracking state, so it is only ever used by
+    one thread at a time and is reset before it is handed out.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown pose backend '{name}', expected one of {sorted(BACKENDS)}")
+    if complexity not in COMPLEXITIES:
+        raise ValueError(f"Unknown pose complexity '{complexity}', expected one of {sorted(COMPLEXITIES)}")
+
+    key = (name, complexity)
+    with _idle_backends_lock:
+        idle = _idle_backends.setdefault(key, [])
+        backend = idle.pop() if idle else None
+    if backend is None:
+        backend = BACKENDS[name](complexity=complexity)
+        backend.warm_up()
+    else:
+        backend.reset()
+
+    try:
+        yield backend
+    except BaseException:
+        # The backend may be halfway through a batch; don't hand it out again
+        backend.close()
+        raise
+    with _idle_backends_lock:
+        _idle_backends[key].append(backend)
+
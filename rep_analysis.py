@@ -0,0 +1,303 @@
+import bisect
+import os
+
+import numpy as np
+
+from joints import DEFAULT_JOINT, joint_angles, validate_joints
+from similarity import SIMILARITY_METHOD, compare_series
+
+
+# Swing in degrees the angle must make away from a peak or valley before the
+# turning point is confirmed; smaller wiggles are treated as noise
+REP_MIN_AMPLITUDE = float(os.environ.get("REP_MIN_AMPLITUDE", 30))
+# Weight of the newest frame in the exponential smoothing of the angle, 1 disables it
+REP_SMOOTHING = float(os.environ.get("REP_SMOOTHING", 0.5))
+# Reps with fewer measured frames than this are dropped as noise
+REP_MIN_FRAMES = int(os.environ.get("REP_MIN_FRAMES", 5))
+# Longer stretches without a complete rep (pauses, resting) are discarded, bounding the buffer
+REP_MAX_FRAMES = int(os.environ.get("REP_MAX_FRAMES", 900))
+
+PEAK = "peak"
+VALLEY = "valley"
+
+
+class RepSegmenter:
+    """
+    Online peak and valley detection on an angle stream.
+
+    Keeps the running extreme of the current movement and confirms it as a
+    turning point once the angle has moved ``min_amplitude`` degrees back
+    from it (hysteresis), so every frame costs O(1) time and memory. Turning
+    points are confirmed with a delay of however many frames that swing
+    takes, and they alternate between peaks and valleys.
+    """
+
+    def __init__(self, min_amplitude=REP_MIN_AMPLITUDE, smoothing=REP_SMOOTHING):
+        self.min_amplitude = min_amplitude
+        self.smoothing = smoothing
+        self._smoothed = None
+        # Direction of the current movement: None until the first turning point, then PEAK
+        # when rising towards a peak or VALLEY when falling towards a valley
+        self._heading = None
+        self._high = self._low = None
+        # Smoothed angle of the last confirmed turning point of each kind
+        self._confirmed = {}
+
+    def candidate(self, kind):
+        """Frame of the running extreme that would be confirmed as the next turning point of ``kind``, or None."""
+        if kind == PEAK:
+            return self._high[0] if self._high is not None and self._heading != VALLEY else None
+        return self._low[0] if self._low is not None and self._heading != PEAK else None
+
+    def pending(self, kind):
+        """
+        Frame of the running extreme if it counts as a turning point of ``kind`` when the stream ends, or None.
+
+        At the end nothing can swing back to confirm it, so it only counts if
+        the movement since the last opposite turning point spans
+        ``min_amplitude`` and got back to within ``min_amplitude`` of the last
+        turning point of the same kind, i.e. it completed the movement rather
+        than stopping halfway.
+        """
+        opposite = VALLEY if kind == PEAK else PEAK
+        if self._heading != kind or kind not in self._confirmed:
+            return None
+        frame, angle = self._high if kind == PEAK else self._low
+        if abs(angle - self._confirmed[opposite]) < self.min_amplitude:
+            return None
+        if abs(angle - self._confirmed[kind]) > self.min_amplitude:
+            return None
+        return frame
+
+    def update(self, frame_index, angle):
+        """
+        Add the angle measured in a frame.
+
+        Returns:
+            tuple: (PEAK or VALLEY, frame index, smoothed angle) of the turning
+                point this frame confirmed, or None
+        """
+        if self._smoothed is None:
+            self._smoothed = angle
+        else:
+            self._smoothed += self.smoothing * (angle - self._smoothed)
+        point = (frame_index, self._smoothed)
+
+        if self._high is None:
+            self._high = self._low = point
+            return None
+
+        if self._heading != VALLEY and self._smoothed > self._high[1]:
+            self._high = point
+        if self._heading != PEAK and self._smoothed < self._low[1]:
+            self._low = point
+
+        if self._heading != VALLEY and self._smoothed <= self._high[1] - self.min_amplitude:
+            confirmed = (PEAK,) + self._high
+            self._confirmed[PEAK] = self._high[1]
+            self._heading = VALLEY
+            self._low = point
+            return confirmed
+        if self._heading != PEAK and self._smoothed >= self._low[1] + self.min_amplitude:
+            confirmed = (VALLEY,) + self._low
+            self._confirmed[VALLEY] = self._low[1]
+            self._heading = PEAK
+            self._high = point
+            return confirmed
+        return None
+
+
+def segment_reps(angles, frame_indices=None, **options):
+    """
+    Split a complete angle series into reps, offline, exactly as RepAnalyzer does online.
+
+    Args:
+        angles (array-like): Angle of every measured frame
+        frame_indices (array-like): Source frame of every angle, defaults to 0, 1, 2...
+        **options: Segmentation options of RepAnalyzer (start, min_amplitude,
+            smoothing, min_frames, max_frames)
+
+    Returns:
+        list: (first, last) positions in ``angles`` of every complete rep, inclusive
+    """
+    frame_indices = np.arange(len(angles)) if frame_indices is None else np.asarray(frame_indices)
+    analyzer = RepAnalyzer(**options)
+    for frame_index, angle in zip(frame_indices.tolist(), np.asarray(angles, dtype=np.float64).tolist()):
+        analyzer.update(frame_index, angle)
+    analyzer.finish()
+    return [
+        (int(np.searchsorted(frame_indices, rep["start_frame"])), int(np.searchsorted(frame_indices, rep["end_frame"])))
+        for rep in analyzer.reps
+    ]
+
+
+def reference_rep(angles, frame_indices=None, **options):
+    """
+    The typical rep of a series: the one with the median length.
+
+    Takes the segmentation options of RepAnalyzer.
+
+    Returns:
+        np.ndarray: Angles of the rep, or None if the series has no complete rep
+    """
+    reps = segment_reps(angles, frame_indices, **options)
+    if not reps:
+        return None
+    first, last = sorted(reps, key=lambda rep: rep[1] - rep[0])[len(reps) // 2]
+    return np.asarray(angles[first:last + 1], dtype=np.float64)
+
+
+class RepAnalyzer:
+    """
+    Incremental rep counter and scorer.
+
+    Consumes one measured frame at a time (``update`` with an angle, or
+    ``update_landmarks`` with a pose from track_video's ``on_landmarks``)
+    and reports every rep as soon as it is complete: it is compared against
+    the reference rep with similarity.compare_series and passed to
+    ``on_rep``. Call ``finish`` at the end of the stream to close the last
+    rep. Per frame the work is constant; the only buffer holds the
+    angles of the rep in progress, so memory does not grow with the length
+    of the session.
+    """
+
+    def __init__(self, reference=None, joint=DEFAULT_JOINT, method=SIMILARITY_METHOD, fps=None, on_rep=None,
+                 start=PEAK, min_amplitude=REP_MIN_AMPLITUDE, smoothing=REP_SMOOTHING, min_frames=REP_MIN_FRAMES,
+                 max_frames=REP_MAX_FRAMES):
+        """
+        Args:
+            reference (array-like): Angles of the reference rep (see
+                reference_rep), or None to count and measure reps without scoring them
+            joint (str): Joint measured by ``update_landmarks``, a name from joints.JOINTS
+            method (str): Similarity method, see similarity.compare_series
+            fps (float): Frame rate of the source video, for rep durations in seconds
+            on_rep (callable): Called with every rep dictionary as soon as the rep completes
+            start (str): Turning point a rep starts and ends at, PEAK or VALLEY
+            min_amplitude, smoothing: See RepSegmenter
+            min_frames (int): Reps with fewer measured frames are dropped as noise
+            max_frames (int): Stretches with more measured frames than this
+                are not reps (the person paused) and are dropped
+        """
+        self.joint = validate_joints([joint])[0]
+        self.method = method
+        self.fps = fps
+        self.on_rep = on_rep
+        self.start = start
+        self.min_frames = min_frames
+        self.max_frames = max_frames
+        self.reference = None if reference is None else np.asarray(reference, dtype=np.float64)
+        self.reps = []
+
+        self._segmenter = RepSegmenter(min_amplitude, smoothing)
+        # Frames of the rep in progress. Until the first rep boundary, only
+        # the frames from the candidate boundary on are kept; whatever comes
+        # before it is the setup, not a rep.
+        self._started = False
+        self._frames = []
+        self._angles = []
+
+    def update_landmarks(self, frame_index, landmarks):
+        """Add a frame's pose, an array of shape (33, 4) as produced by track_video."""
+        return self.update(frame_index, float(joint_angles(np.asarray(landmarks)[None], [self.joint])[self.joint][0]))
+
+    def update(self, frame_index, angle):
+        """
+        Add the angle measured in a frame.
+
+        Returns:
+            dict: The rep this frame completed (see ``reps``), or None
+        """
+        self._frames.append(frame_index)
+        self._angles.append(angle)
+
+        turning_point = self._segmenter.update(frame_index, angle)
+        if turning_point is None or turning_point[0] != self.start:
+            if len(self._frames) > self.max_frames:
+                # Too long for a rep; start over at the next boundary
+                self._started = False
+                self._drop_before(frame_index)
+            elif not self._started:
+                # Boundaries are confirmed a few frames late, so keep the frames from the candidate on
+                candidate = self._segmenter.candidate(self.start)
+                self._drop_before(frame_index if candidate is None else candidate)
+            return None
+        return self._close_rep(turning_point[1])
+
+    def finish(self):
+        """
+        End of the stream: the last rep's closing turning point cannot be
+        confirmed by a swing back, so close it at the running extreme if the
+        movement got that far (see RepSegmenter.pending); a rep cut off
+        halfway is dropped.
+
+        Returns:
+            dict: The rep this completed, or None
+        """
+        boundary = self._segmenter.pending(self.start)
+        if not self._started or boundary is None:
+            self._started = False
+            return None
+        rep = self._close_rep(boundary)
+        self._started = False
+        return rep
+
+    def _close_rep(self, boundary):
+        # The boundary frame ends this rep and starts the next one
+        split = bisect.bisect_right(self._frames, boundary)
+        frames, angles = self._frames[:split], self._angles[:split]
+        del self._frames[:max(split - 1, 0)], self._angles[:max(split - 1, 0)]
+        if not self._started:
+            self._started = True
+            return None
+        if len(frames) < self.min_frames:
+            return None
+
+        rep = self._score(frames, np.asarray(angles, dtype=np.float64))
+        self.reps.append(rep)
+        if self.on_rep is not None:
+            self.on_rep(rep)
+        return rep
+
+    def _drop_before(self, frame_index):
+        keep_from = bisect.bisect_left(self._frames, frame_index)
+        del self._frames[:keep_from], self._angles[:keep_from]
+
+    def _score(self, frames, angles):
+        rep = {
+            "rep": len(self.reps) + 1,
+            "start_frame": frames[0],
+            "end_frame": frames[-1],
+            "duration": (frames[-1] - frames[0]) / self.fps if self.fps else None,
+            "min_angle": float(angles.min()),
+            "max_angle": float(angles.max()),
+            "range_of_motion": float(angles.max() - angles.min()),
+            "similarity": None,
+            "distance": None,
+            "range_of_motion_ratio": None,
+            "tempo_ratio": None,
+        }
+        if self.reference is not None:
+            comparison = compare_series(self.reference, angles, method=self.method)
+            reference_range = self.reference.max() - self.reference.min()
+            rep.update({
+                "similarity": comparison["similarity"],
+                "distance": comparison["distance"],
+                "range_of_motion_ratio": rep["range_of_motion"] / reference_range if reference_range else None,
+                # Above 1 when the rep took longer than the reference
+                "tempo_ratio": len(angles) / len(self.reference),
+            })
+        return rep
+
+    def summary(self):
+        """
+        Returns:
+            dict: ``reps``, every completed rep, ``count``, and the mean
+                ``similarity`` and ``range_of_motion`` over all reps (None without reps or reference)
+        """
+        similarities = [rep["similarity"] for rep in self.reps if rep["similarity"] is not None]
+        return {
+            "reps": self.reps,
+            "count": len(self.reps),
+            "similarity": float(np.mean(similarities)) if similarities else None,
+            "range_of_motion": float(np.mean([rep["range_of_motion"] for rep in self.reps])) if self.reps else None,
+        }
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+
+ANALYSIS_CACHE_DIR = os.environ.get("ANALYSIS_CACHE_DIR", ".cache/analysis")
+ANALYSIS_CACHE_MB = int(os.environ.get("ANALYSIS_CACHE_MB", 1024))
+
+# Bump when a change to the pose pipeline makes earlier cached results stale
+PIPELINE_VERSION = 2
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(*digests, **params):
+    """Key for content digests combined with the pipeline parameters that produced the result."""
+    payload = json.dumps({"version": PIPELINE_VERSION, "digests": digests, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk store for sport analysis results.
+
+    Per-video entries hold the arm angle series, the full landmark array and the
+    URL of the uploaded pose video, keyed by the video's content hash and the
+    pipeline parameters. Pair entries hold the full analysis response for a
+    (correct, wrong) video pair. Entries are written atomically, so several
+    worker processes can share one store. Reading an entry marks it as
+    recently used, and the least recently used entries are evicted once the
+    store grows beyond ``max_bytes``.
+    """
+
+    def __init__(self, root=ANALYSIS_CACHE_DIR, max_bytes=ANALYSIS_CACHE_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+        os.makedirs(os.path.join(root, "videos"), exist_ok=True)
+        os.makedirs(os.path.join(root, "pairs"), exist_ok=True)
+
+    def get_video(self, digest, **params):
+        """
+        Returns:
+            dict: ``angles``, ``landmarks`` and ``pose_video_url`` (None until
+                set_video_url is called), or None on a miss
+        """
+        key = cache_key(digest, **params)
+        arrays_path = self._path("videos", key, ".npz")
+        meta = self._read_json(self._path("videos", key, ".json"))
+        if meta is None:
+            return None
+        try:
+            with np.load(arrays_path) as arrays:
+                angles = arrays["angles"].tolist()
+                landmarks = arrays["landmarks"]
+        except (OSError, KeyError, ValueError):
+            return None
+        self._touch(arrays_path)
+        return {"angles": angles, "landmarks": landmarks, "pose_video_url": meta.get("pose_video_url")}
+
+    def put_video(self, digest, angles, landmarks, pose_video_url=None, **params):
+        key = cache_key(digest, **params)
+        self._write(self._path("videos", key, ".npz"),
+                    lambda f: np.savez(f, angles=np.asarray(angles, dtype=np.float64), landmarks=landmarks))
+        # The metadata file is written last and marks the entry as complete
+        self._write_json(self._path("videos", key, ".json"), {"pose_video_url": pose_video_url})
+        self.evict()
+
+    def set_video_url(self, digest, pose_video_url, **params):
+        key = cache_key(digest, **params)
+        if os.path.exists(self._path("videos", key, ".json")):
+            self._write_json(self._path("videos", key, ".json"), {"pose_video_url": pose_video_url})
+
+    def get_pair(self, correct_digest, wrong_digest, **params):
+        return self._read_json(self._path("pairs", cache_key(correct_digest, wrong_digest, **params), ".json"))
+
+    def put_pair(self, correct_digest, wrong_digest, result, **params):
+        self._write_json(self._path("pairs", cache_key(correct_digest, wrong_digest, **params), ".json"), result)
+        self.evict()
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Remove least recently used files until the store fits in ``max_bytes``."""
+        with self._evict_lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def _entries(self):
+        for folder in ("videos", "pairs"):
+            folder_path = os.path.join(self.root, folder)
+            for name in os.listdir(folder_path):
+                if name.startswith("."):
+                    continue
+                path = os.path.join(folder_path, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _path(self, folder, key, suffix):
+        return os.path.join(self.root, folder, key + suffix)
+
+    def _read_json(self, path):
+        try:
+            with open(path) as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._touch(path)
+        return value
+
+    def _write_json(self, path, value):
+        self._write(path, lambda f: f.write(json.dumps(value).encode()))
+
+    @staticmethod
+    def _write(path, write):
+        fd, tmp_path = tempfile.mkstemp(prefix=".", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _touch(path):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Process-wide ResultCache, created on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
@@ -1,25 +1,29 @@
+import logging
 import requests
 import os
+from s3_transfer import download_file
+from workspace import QuotaExceeded
+from metrics import S3_BYTES, timed
 
-def download_s3_file(url, output_path):
+logger = logging.getLogger(__name__)
+
+def download_s3_file(url, output_path, max_bytes=None):
 
     try:
         
-        response = requests.get(url, stream=True)
-        response.raise_for_status()  
-        
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    
-        return output_path
+        # Pooled session, with ranged parallel transfer for large files
+        with timed("download", url=url):
+            path = download_file(url, output_path, max_bytes=max_bytes)
+        S3_BYTES.labels("download").inc(os.path.getsize(path))
+        return path
         
     except requests.exceptions.RequestException as e:
-        print(f"Error downloading file: {e}")
+        logger.warning("Error downloading file", extra={"url": url, "error": str(e)})
         return False
+    except QuotaExceeded:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
 
 
-# download_s3_file(url="https://rp-projects-public.s3.amazonaws.com/Incorrect 1.mp4" , output_path="temp/incorrect.mp4")
\ No newline at end of file
+# download_s3_file(url="https://rp-projects-public.s3.amazonaws.com/Incorrect 1.mp4" , output_path="temp/incorrect.mp4")
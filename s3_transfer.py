@@ -0,0 +1,134 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import boto3
+import requests
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from workspace import QuotaExceeded
+
+
+# Point the client at a local S3 stand-in (moto server, MinIO) for testing
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")
+# Concurrent connections shared by all transfers in the process
+MAX_CONNECTIONS = int(os.environ.get("S3_MAX_CONNECTIONS", 16))
+# Files larger than this are transferred in parts
+MULTIPART_THRESHOLD = int(os.environ.get("S3_MULTIPART_THRESHOLD_MB", 16)) * 1024 * 1024
+PART_SIZE = int(os.environ.get("S3_PART_SIZE_MB", 8)) * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_THRESHOLD,
+    multipart_chunksize=PART_SIZE,
+    max_concurrency=MAX_CONNECTIONS,
+)
+
+
+@lru_cache(maxsize=None)
+def get_http_session():
+    """Process-wide requests session with a connection pool and retries."""
+    session = requests.Session()
+    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504), allowed_methods=("GET", "HEAD"))
+    adapter = HTTPAdapter(pool_connections=MAX_CONNECTIONS, pool_maxsize=MAX_CONNECTIONS, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@lru_cache(maxsize=None)
+def get_s3_client(aws_access_key=None, aws_secret_key=None, endpoint_url=S3_ENDPOINT_URL):
+    """
+    Process-wide boto3 S3 client, one per set of credentials.
+    boto3 clients are thread-safe, so concurrent uploads share its connection pool.
+    """
+    return boto3.client(
+        "s3",
+        aws_access_key_id=aws_access_key,
+        aws_secret_access_key=aws_secret_key,
+        endpoint_url=endpoint_url,
+        config=Config(max_pool_connections=MAX_CONNECTIONS),
+    )
+
+
+def object_url(bucket_name, key, endpoint_url=S3_ENDPOINT_URL):
+    if endpoint_url:
+        return f"{endpoint_url.rstrip('/')}/{bucket_name}/{key}"
+    return f"https://{bucket_name}.s3.amazonaws.com/{key}"
+
+
+def _download_range(url, output_path, start, end):
+    with get_http_session().get(url, headers={"Range": f"bytes={start}-{end}"}, stream=True) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise requests.exceptions.RequestException(f"{url} ignored the range request")
+        with open(output_path, "r+b") as f:
+            f.seek(start)
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+
+
+def download_file(url, output_path, max_bytes=None):
+    """
+    Download ``url`` to ``output_path`` over the shared session.
+
+    Files larger than MULTIPART_THRESHOLD are fetched as parallel ranged
+    requests when the server supports them; smaller files, or servers without
+    range support, are streamed in 1 MB chunks.
+
+    Raises:
+        QuotaExceeded: If the file is larger than ``max_bytes``
+        requests.exceptions.RequestException: If the download fails
+    """
+    session = get_http_session()
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    head = session.head(url, allow_redirects=True)
+    size = int(head.headers.get("Content-Length") or 0) if head.ok else 0
+    if max_bytes is not None and size > max_bytes:
+        raise QuotaExceeded(f"{url} is {size} bytes, only {max_bytes} bytes allowed")
+
+    if head.ok and size > MULTIPART_THRESHOLD and head.headers.get("Accept-Ranges") == "bytes":
+        with open(output_path, "wb") as f:
+            f.truncate(size)
+        ranges = [(start, min(start + PART_SIZE, size) - 1) for start in range(0, size, PART_SIZE)]
+        with ThreadPoolExecutor(max_workers=min(len(ranges), MAX_CONNECTIONS)) as pool:
+            for future in [pool.submit(_download_range, url, output_path, start, end) for start, end in ranges]:
+                future.result()
+        return output_path
+
+    written = 0
+    with session.get(url, stream=True) as response:
+        response.raise_for_status()
+        with open(output_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise QuotaExceeded(f"{url} is larger than the {max_bytes} bytes allowed")
+                f.write(chunk)
+    return output_path
+
+
+def upload_file(file_path, bucket_name, key, aws_access_key=None, aws_secret_key=None):
+    """Upload a file with the shared client, using multipart uploads for large files, and return its URL."""
+    client = get_s3_client(aws_access_key, aws_secret_key, S3_ENDPOINT_URL)
+    client.upload_file(file_path, bucket_name, key, Config=TRANSFER_CONFIG)
+    return object_url(bucket_name, key, S3_ENDPOINT_URL)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Thread pool shared by concurrent transfers."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_CONNECTIONS, thread_name_prefix="s3-transfer")
+        return _executor
+
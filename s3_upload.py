@@ -1,28 +1,23 @@
-import boto3
 import os 
+from s3_transfer import upload_file
+from metrics import S3_BYTES, timed
 
 
 
 def upload_to_s3(file_path,bucket_name="rp-projects-public", 
                  aws_access_key="************", 
-                 aws_secret_key="************"):
+                 aws_secret_key="************",
+                 key=None):
   
-    s3_client = boto3.client(
-        "s3",
-        aws_access_key_id=aws_access_key,
-        aws_secret_access_key=aws_secret_key
-    )
+    # Use the given object key, or the filename from the path
+    upload_file_name = key or f"{os.path.basename(file_path)}"
     
-    # Get the filename from the path
-    upload_file_name = f"{os.path.basename(file_path)}"
-    
-    # Upload the file
-    s3_client.upload_file(file_path, bucket_name, upload_file_name)
-    
-    # Generate and return the URL
-    file_url = f"https://{bucket_name}.s3.amazonaws.com/{upload_file_name}"
-    
-    return file_url
+    # Upload the file with the shared client and generate the URL
+    with timed("upload", key=upload_file_name):
+        url = upload_file(file_path, bucket_name, upload_file_name,
+                          aws_access_key=aws_access_key, aws_secret_key=aws_secret_key)
+    S3_BYTES.labels("upload").inc(os.path.getsize(file_path))
+    return url
 
 
 # print(upload_to_s3(file_path="/home/shamal/code/freelance_projects/fitness_project/abrasions (1) (1).jpg"))
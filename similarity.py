@@ -0,0 +1,186 @@
+import os
+
+import numpy as np
+from scipy.spatial.distance import cosine
+
+
+METHODS = ("dtw", "resample", "cosine")
+SIMILARITY_METHOD = os.environ.get("SIMILARITY_METHOD", "dtw")
+# Half-width of the DTW band as a fraction of the longer series
+DTW_BAND = float(os.environ.get("DTW_BAND", 0.1))
+
+# Step directions stored while filling the DTW matrix
+_DIAGONAL, _UP, _LEFT = 0, 1, 2
+
+
+def cosine_similarity(a, b):
+    """Cosine similarity of two equally long series, 0 if either is all zeros."""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    if not a.any() or not b.any():
+        return 0
+    return 1 - cosine(a, b)
+
+
+def resample(series, length):
+    """Linearly resample a series to ``length`` evenly spaced points."""
+    series = np.asarray(series, dtype=np.float64)
+    if len(series) == length:
+        return series
+    if len(series) < 2:
+        return np.full(length, series[0] if len(series) else 0.0)
+    return np.interp(np.linspace(0, len(series) - 1, length), np.arange(len(series)), series)
+
+
+def _band(n, m, radius):
+    """Column range [lo, hi] of every row in a band around the diagonal from (0, 0) to (n-1, m-1)."""
+    centers = np.arange(n) * ((m - 1) / (n - 1)) if n > 1 else np.zeros(1)
+    # Rows must overlap enough for the warping path to stay connected
+    radius = max(radius, int(np.ceil((m - 1) / max(n - 1, 1))), 1)
+    lo = np.clip(np.floor(centers - radius).astype(np.int64), 0, m - 1)
+    hi = np.clip(np.ceil(centers + radius).astype(np.int64), 0, m - 1)
+    return lo, hi
+
+
+def dtw(a, b, band=DTW_BAND):
+    """
+    Dynamic time warping between two series with a Sakoe-Chiba band.
+
+    Only cells within ``band`` of the diagonal are computed, so time and memory
+    grow with ``len(a) * band_width`` instead of ``len(a) * len(b)``. Each row
+    is filled with a handful of vectorized NumPy operations: the dependency on
+    the cell to the left is resolved with a prefix minimum over the row instead
+    of a Python loop. Only the chosen step of every cell is kept (one byte per
+    cell) to recover the path.
+
+    Args:
+        a (array-like): First series
+        b (array-like): Second series
+        band (float): Half-width of the band, as a fraction of the longer
+            series if below 1 or as a number of frames otherwise. None
+            computes the full matrix
+
+    Returns:
+        tuple: Accumulated absolute difference along the best path and the
+            path itself, an int array of shape (steps, 2) of matched (i, j)
+            indices from (0, 0) to (len(a)-1, len(b)-1)
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    n, m = len(a), len(b)
+    if not n or not m:
+        raise ValueError("DTW needs two non-empty series")
+
+    if band is None:
+        radius = m
+    elif band < 1:
+        radius = int(np.ceil(band * max(n, m)))
+    else:
+        radius = int(band)
+    lo, hi = _band(n, m, radius)
+    width = int((hi - lo).max()) + 1
+
+    steps = np.empty((n, width), dtype=np.int8)
+    previous = None
+    for i in range(n):
+        start, stop = lo[i], hi[i] + 1
+        cost = np.abs(a[i] - b[start:stop])
+
+        if previous is None:
+            row = np.cumsum(cost)
+            steps[i, :len(row)] = _LEFT
+        else:
+            previous_start, previous_row = previous
+            # Best of the diagonal and the vertical step into every cell of the row
+            padded = np.full(stop - start + 1, np.inf)
+            overlap_start = max(start - 1, previous_start)
+            overlap_stop = min(stop, previous_start + len(previous_row))
+            padded[overlap_start - start + 1:overlap_stop - start + 1] = \
+                previous_row[overlap_start - previous_start:overlap_stop - previous_start]
+            diagonal, up = padded[:-1], padded[1:]
+            from_above = np.minimum(diagonal, up) + cost
+
+            # row[j] = min(from_above[j], row[j-1] + cost[j]) unrolls to
+            # prefix[j] + min over k <= j of (from_above[k] - prefix[k])
+            prefix = np.cumsum(cost)
+            candidates = from_above - prefix
+            best = np.minimum.accumulate(candidates)
+            row = prefix + best
+
+            row_steps = np.where(up < diagonal, _UP, _DIAGONAL).astype(np.int8)
+            row_steps[best < candidates] = _LEFT
+            steps[i, :len(row)] = row_steps
+
+        previous = (start, row)
+
+    distance = float(previous[1][-1])
+    return distance, _backtrack(steps, lo, n, m)
+
+
+def _backtrack(steps, lo, n, m):
+    path = np.empty((n + m, 2), dtype=np.int64)
+    i, j = n - 1, m - 1
+    length = 0
+    while True:
+        path[length] = i, j
+        length += 1
+        if i == 0 and j == 0:
+            break
+        step = steps[i, j - lo[i]] if i else _LEFT
+        if step == _DIAGONAL:
+            i, j = i - 1, j - 1
+        elif step == _UP:
+            i -= 1
+        else:
+            j -= 1
+    return path[:length][::-1]
+
+
+def compare_series(a, b, method=SIMILARITY_METHOD, band=DTW_BAND):
+    """
+    Similarity of two angle series.
+
+    Args:
+        a (array-like): First series
+        b (array-like): Second series
+        method (str): ``dtw`` aligns the series with dynamic time warping and
+            compares the matched frames, so the same movement performed at a
+            different speed still scores high. ``resample`` stretches both
+            series to the same length. ``cosine`` truncates the longer series
+            and compares frame by frame (the original behaviour)
+        band (float): DTW band, see dtw
+
+    Returns:
+        dict: ``similarity``, the cosine similarity percentage, ``distance``,
+            the mean absolute angle difference between compared frames, and
+            ``path``, the (i, j) index pairs that were compared
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown similarity method '{method}', expected one of {METHODS}")
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    if not len(a) or not len(b):
+        return {"similarity": 0.0, "distance": None, "path": np.empty((0, 2), dtype=np.int64)}
+
+    if method == "dtw":
+        distance, path = dtw(a, b, band=band)
+        matched_a, matched_b = a[path[:, 0]], b[path[:, 1]]
+        distance /= len(path)
+    elif method == "resample":
+        length = max(len(a), len(b))
+        matched_a, matched_b = resample(a, length), resample(b, length)
+        positions = np.arange(length)
+        path = np.stack([np.round(positions * (len(a) - 1) / max(length - 1, 1)),
+                         np.round(positions * (len(b) - 1) / max(length - 1, 1))], axis=1).astype(np.int64)
+        distance = float(np.abs(matched_a - matched_b).mean())
+    else:
+        length = min(len(a), len(b))
+        matched_a, matched_b = a[:length], b[:length]
+        path = np.stack([np.arange(length), np.arange(length)], axis=1)
+        distance = float(np.abs(matched_a - matched_b).mean())
+
+    return {
+        "similarity": cosine_similarity(matched_a, matched_b) * 100,
+        "distance": distance,
+        "path": path,
+    }
@@ -0,0 +1,55 @@
+import fcntl
+import os
+import time
+
+
+SLOTS_DIR = os.environ.get("SLOTS_DIR", ".cache/slots")
+
+
+class SharedSlots:
+    """
+    Counting semaphore shared by every process on the host.
+
+    Each slot is a lock file in ``directory`` and holding a slot means
+    holding an exclusive ``flock`` on its file. The kernel drops the lock
+    when the holder closes the file or dies, so a crashed worker can never
+    leak a slot. Under gunicorn every worker opens the same files, which
+    makes the limits global instead of multiplying them by the worker count.
+    Instances only hold their settings and can be pickled to worker processes.
+    ``directory`` defaults to SLOTS_DIR.
+    """
+
+    def __init__(self, name, count, directory=None):
+        self.name = name
+        self.count = count
+        self.directory = directory or SLOTS_DIR
+
+    def try_acquire(self):
+        """
+        Take a free slot without waiting.
+
+        Returns:
+            file: Handle of the slot, pass it to ``release``; None if all slots are taken
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        for index in range(self.count):
+            handle = open(os.path.join(self.directory, f"{self.name}-{index}.lock"), "a")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()
+                continue
+            return handle
+        return None
+
+    def acquire(self, poll_interval=0.1):
+        """Take a slot, waiting until one is free."""
+        while True:
+            handle = self.try_acquire()
+            if handle is not None:
+                return handle
+            time.sleep(poll_interval)
+
+    @staticmethod
+    def release(handle):
+        handle.close()
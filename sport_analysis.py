@@ -1,10 +1,43 @@
 import cv2
 import mediapipe as mp
+from mediapipe.framework.formats import landmark_pb2
 import numpy as np
-import matplotlib.pyplot as plt
-from moviepy.editor import ImageSequenceClip
 import os
 from scipy.spatial.distance import cosine
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import threading
+import itertools
+import logging
+from video_encoder import VideoEncoder, concat_videos
+from angle_animation import AngleComparisonRenderer, save_final_graph
+from joints import JOINTS, DEFAULT_JOINT, NUM_LANDMARKS, LANDMARK_FIELDS, joint_angles
+from similarity import SIMILARITY_METHOD, compare_series
+from pose_backends import POSE_BACKEND, POSE_COMPLEXITY, pose_backend
+from rep_analysis import RepAnalyzer, reference_rep
+from logs import configure_logging
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Number of processes used to run pose estimation, 1 runs everything in-process
+SPORT_ANALYSIS_WORKERS = int(os.environ.get("SPORT_ANALYSIS_WORKERS", min(2, os.cpu_count() or 1)))
+
+# Artifacts an analysis can generate; callers can ask for any subset, or none for the similarity only
+OUTPUTS = ("pose_videos", "angle_comparison_video", "final_graph")
+
+def validate_outputs(outputs):
+    """
+    Raises:
+        ValueError: If an output name is not in OUTPUTS
+    """
+    if outputs is None:
+        return OUTPUTS
+    unknown = [output for output in outputs if output not in OUTPUTS]
+    if unknown:
+        raise ValueError(f"Unknown outputs {unknown}, expected any of {list(OUTPUTS)}")
+    return tuple(outputs)
 
 def calculate_angle(a, b, c):
     a = np.array(a)
@@ -23,6 +56,7 @@ def calculate_cosine_similarity(list1, list2):
     """
     Calculate cosine similarity between two lists.
     If lists have different lengths, truncate the longer one.
+    See similarity.compare_series for speed-independent comparisons.
     """
     # Ensure lists are numpy arrays
     list1 = np.array(list1)
@@ -42,9 +76,125 @@ def calculate_cosine_similarity(list1, list2):
     similarity = 1 - cosine(list1, list2)
     return similarity
 
-def process_video(video_path):
-    angles = []
+def process_video(video_path, output_path=None, **options):
+    """
+    Run pose estimation on a video and measure the left elbow angle in every frame.
+
+    Takes the same arguments as track_video.
+
+    Returns:
+        tuple: List of elbow angles, and the list of annotated frames
+            (empty when streaming to ``output_path``)
+    """
     frames = []
+    track = track_video(video_path, output_path=output_path, frames=None if output_path else frames, **options)
+    return track["angles"], frames
+
+def _sampling_stride(cap, stride=1, target_fps=None):
+    if target_fps:
+        source_fps = cap.get(cv2.CAP_PROP_FPS) or target_fps
+        return max(1, int(round(source_fps / target_fps)))
+    return max(1, int(stride))
+
+def interpolate_track(track):
+    """
+    Fill the frames skipped by frame sampling by linear interpolation.
+
+    Landmarks are interpolated onto every source frame between the first and
+    the last measured frame and the angles are measured on the result.
+    """
+    frame_indices = np.asarray(track["frame_indices"])
+    if len(frame_indices) < 2:
+        return track
+
+    source_frames = np.arange(frame_indices[0], frame_indices[-1] + 1)
+    landmarks = track["landmarks"]
+    flat = landmarks.reshape(len(landmarks), -1)
+    interpolated = np.stack([np.interp(source_frames, frame_indices, flat[:, i]) for i in range(flat.shape[1])], axis=1)
+
+    interpolated = interpolated.astype(np.float32).reshape((len(source_frames),) + landmarks.shape[1:])
+    return {
+        "angles": joint_angles(interpolated)[DEFAULT_JOINT].tolist(),
+        "landmarks": interpolated,
+        "frame_indices": source_frames.tolist()
+    }
+
+def _read_frames(cap, start_frame, stop_frame, stride, scaled_size):
+    # Yields (frame number, RGB image) of every sampled frame
+    frame_index = start_frame
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    while cap.isOpened():
+        if stop_frame is not None and frame_index >= stop_frame:
+            return
+        current_frame = frame_index
+        frame_index += 1
+
+        # Sampling is aligned to absolute frame numbers so video segments sample the same frames
+        if current_frame % stride:
+            # grab() advances without converting the frame
+            if not cap.grab():
+                return
+            continue
+
+        ret, frame = cap.read()
+        if not ret:
+            return
+        if scaled_size:
+            frame = cv2.resize(frame, scaled_size, interpolation=cv2.INTER_AREA)
+        yield current_frame, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+def _landmark_list(landmarks):
+    # mediapipe's drawing utils expect the landmark protobuf
+    return landmark_pb2.NormalizedLandmarkList(landmark=[
+        landmark_pb2.NormalizedLandmark(x=x, y=y, z=z, visibility=visibility)
+        for x, y, z, visibility in landmarks.tolist()
+    ])
+
+@timed("pose_inference")
+def track_video(video_path, output_path=None, fps=15, start_frame=0, stop_frame=None, record_from=None, frames=None,
+                stride=1, target_fps=None, max_side=None, interpolate=True, backend=POSE_BACKEND,
+                complexity=POSE_COMPLEXITY, on_landmarks=None, keep_landmarks=True):
+    """
+    Run pose estimation on a video, record the full pose and measure the left elbow angle in every frame.
+
+    Args:
+        video_path (str): Path to the input video
+        output_path (str): When given, annotated frames are streamed straight into
+            an MP4 at this path and are not kept in memory, so peak memory does
+            not grow with the length of the video
+        fps (int): Frame rate of the annotated output video
+        start_frame (int): First frame to decode
+        stop_frame (int): Frame to stop before, or None to read to the end
+        record_from (int): Frames before this index are run through the pose
+            tracker to warm it up but are not measured or annotated
+        frames (list): When given and ``output_path`` is not, annotated frames
+            are appended to this list
+        stride (int): Only run pose estimation on every ``stride``-th frame
+        target_fps (float): Sample frames at roughly this rate instead of a fixed stride
+        max_side (int): Downscale frames so their longest side is at most this
+            many pixels before inference; the annotated video uses the smaller size
+        interpolate (bool): Interpolate angles and landmarks of skipped frames
+            back onto the source timeline (see interpolate_track)
+        backend (str): Pose inference backend, ``mediapipe`` or ``onnx`` (see pose_backends)
+        complexity (str): Pose model, ``lite``, ``full`` or ``heavy``
+        on_landmarks (callable): Called with the source frame number and the
+            (33, 4) landmark array of every measured frame as soon as it is
+            measured, e.g. RepAnalyzer.update_landmarks. The array is reused
+            afterwards, so copy it to keep it
+        keep_landmarks (bool): False only streams the landmarks to
+            ``on_landmarks`` and returns an empty track, so memory stays flat
+            however long the video is
+
+    Returns:
+        dict: ``angles``, the list of left elbow angles, ``landmarks``, a
+            float32 array of shape (frames, 33, 4) with the normalized x, y, z
+            coordinates and visibility of every pose landmark in every measured
+            frame, and ``frame_indices``, the source frame of every measurement.
+            Angles of other joints are measured from the landmarks with
+            joints.joint_angles, without running pose estimation again.
+    """
     cap = cv2.VideoCapture(video_path)
     mp_pose = mp.solutions.pose
     mp_drawing = mp.solutions.drawing_utils
@@ -54,36 +204,67 @@ def process_video(video_path):
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
+    stride = _sampling_stride(cap, stride, target_fps)
+
+    # Landmarks are written straight into one preallocated array, sized for the
+    # expected number of sampled frames and grown if the frame count was off
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    last_frame = frame_count if stop_frame is None else min(stop_frame, frame_count)
+    capacity = max(1, -(-(last_frame - start_frame) // stride)) if keep_landmarks else 1
+    landmark_buffer = np.empty((capacity, NUM_LANDMARKS, len(LANDMARK_FIELDS)), dtype=np.float32)
+    frame_indices = np.empty(capacity, dtype=np.int64)
+    measured = 0
+    scaled_size = None
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+        width, height = int(round(width * scale)), int(round(height * scale))
+        scaled_size = (width, height)
+
+    encoder = VideoEncoder(output_path, fps=fps) if output_path else nullcontext()
+    # Annotations are only drawn when someone receives the frames
+    annotate = output_path is not None or frames is not None
+
+    sampled = _read_frames(cap, start_frame, stop_frame, stride, scaled_size)
+
+    with encoder, pose_backend(backend, complexity) as pose:
+        while True:
+            # Frames are handed to the backend in batches, in video order
+            batch = list(itertools.islice(sampled, pose.batch_size))
+            if not batch:
                 break
+            results = pose.process_batch([image for _, image in batch])
 
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = pose.process(image)
+            for (current_frame, image), pose_landmarks in zip(batch, results):
+                record = record_from is None or current_frame >= record_from
+                if pose_landmarks is None or not record:
+                    continue
+
+                if measured == len(landmark_buffer):
+                    landmark_buffer = np.concatenate([landmark_buffer, np.empty_like(landmark_buffer)])
+                    frame_indices = np.concatenate([frame_indices, np.empty_like(frame_indices)])
+                row = landmark_buffer[measured]
+                row[:] = pose_landmarks
+                frame_indices[measured] = current_frame
+                if keep_landmarks:
+                    measured += 1
+                if on_landmarks is not None:
+                    on_landmarks(current_frame, row)
+
+                if not annotate:
+                    continue
 
-            if results.pose_landmarks:
                 # Draw the pose annotations on the image
-                annotated_image = image.copy()
+                annotated_image = image
                 mp_drawing.draw_landmarks(
                     annotated_image,
-                    results.pose_landmarks,
+                    _landmark_list(pose_landmarks),
                     mp_pose.POSE_CONNECTIONS,
                     landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style())
-                
-                landmarks = results.pose_landmarks.landmark
-
-                shoulder = [landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                          landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-                elbow = [landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].x,
-                        landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].y]
-                wrist = [landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].x,
-                        landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].y]
 
+                # The angle label is drawn now, the angle series is measured in one pass at the end
+                shoulder, elbow, wrist = row[list(JOINTS[DEFAULT_JOINT]), :2]
                 angle = calculate_angle(shoulder, elbow, wrist)
-                angles.append(angle)
-                
+
                 # Convert normalized coordinates to pixel values for visualization
                 cx, cy = int(elbow[0] * width), int(elbow[1] * height)
                 
@@ -114,12 +295,158 @@ def process_video(video_path):
                     
             
                 
-                frames.append(annotated_image)
+                if output_path:
+                    encoder.write(annotated_image)
+                elif frames is not None:
+                    frames.append(annotated_image)
 
     cap.release()
-    return angles, frames
+    landmarks = landmark_buffer[:measured].copy()
+    track = {
+        "angles": joint_angles(landmarks)[DEFAULT_JOINT].tolist(),
+        "landmarks": landmarks,
+        "frame_indices": frame_indices[:measured].tolist()
+    }
+    if interpolate and stride > 1:
+        track = interpolate_track(track)
+    return track
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    # Pools are kept for the life of the process so mediapipe is only
+    # imported once per worker. spawn is used because mediapipe's native
+    # threads do not survive a fork.
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=configure_logging)
+            _pools[workers] = pool
+        return pool
+
+
+def _split_segments(video_path, segment_frames, warmup_frames):
+    cap = cv2.VideoCapture(video_path)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    if not segment_frames or frame_count <= segment_frames:
+        return [(0, None, None)]
+
+    segments = []
+    for start in range(0, frame_count, segment_frames):
+        stop = start + segment_frames if start + segment_frames < frame_count else None
+        # Each segment starts a few frames early so its tracker has settled by the first recorded frame
+        segments.append((max(0, start - warmup_frames), stop, start if start else None))
+    return segments
+
+
+def process_videos(videos, fps=15, workers=None, segment_frames=None, warmup_frames=30,
+                   stride=1, target_fps=None, max_side=None, backend=POSE_BACKEND, complexity=POSE_COMPLEXITY):
+    """
+    Run track_video on several videos in parallel worker processes.
+
+    Every worker reuses its warmed-up pose backends (see
+    pose_backends.pose_backend). Whole videos always produce exactly the
+    same angles as running process_video on them one after the other. Long
+    videos can additionally be split into segments of ``segment_frames``
+    frames that run in parallel; their angles are stitched back in frame
+    order and their annotated videos concatenated. Each segment starts with
+    a fresh tracker that is warmed up on the ``warmup_frames`` frames before
+    it, so segment boundaries may differ marginally from a sequential run.
+
+    Args:
+        videos (list): (video_path, output_path) pairs, output_path may be None
+        fps (int): Frame rate of the annotated output videos
+        workers (int): Number of worker processes, defaults to SPORT_ANALYSIS_WORKERS
+        segment_frames (int): Split videos longer than this many frames, None disables splitting
+        warmup_frames (int): Tracker warm-up frames before each segment
+        stride, target_fps, max_side: Frame sampling and downscaling, see track_video
+        backend, complexity: Pose inference backend and model, see track_video
+
+    Returns:
+        list: track_video result of every video, in input order
+    """
+    workers = workers or SPORT_ANALYSIS_WORKERS
+
+    # One list of track_video keyword arguments per video, one entry per segment
+    tasks = []
+    for video_path, output_path in videos:
+        segments = _split_segments(video_path, segment_frames, warmup_frames)
+        parts = []
+        for index, (start, stop, record_from) in enumerate(segments):
+            part_output = output_path
+            if output_path and len(segments) > 1:
+                part_output = f"{os.path.splitext(output_path)[0]}.part{index:03d}.mp4"
+            parts.append({
+                "video_path": video_path,
+                "output_path": part_output,
+                "fps": fps,
+                "start_frame": start,
+                "stop_frame": stop,
+                "record_from": record_from,
+                "stride": stride,
+                "target_fps": target_fps,
+                "max_side": max_side,
+                "backend": backend,
+                "complexity": complexity,
+                # Skipped frames are interpolated once the segments are stitched together
+                "interpolate": False
+            })
+        tasks.append(parts)
 
-def analyze_arm_angles(correct_video_path, wrong_video_path, output_folder='temp'):
+    if workers <= 1:
+        results = [[track_video(**part) for part in parts] for parts in tasks]
+    else:
+        pool = _get_pool(workers)
+        futures = [[pool.submit(track_video, **part) for part in parts] for parts in tasks]
+        results = [[future.result() for future in video_futures] for video_futures in futures]
+
+    tracks = []
+    for (_, output_path), parts, part_tracks in zip(videos, tasks, results):
+        track = {"angles": [], "frame_indices": []}
+        for part_track in part_tracks:
+            track["angles"].extend(part_track["angles"])
+            track["frame_indices"].extend(part_track["frame_indices"])
+        track["landmarks"] = np.concatenate([part_track["landmarks"] for part_track in part_tracks])
+        if stride > 1 or target_fps:
+            track = interpolate_track(track)
+        tracks.append(track)
+
+        if output_path and len(parts) > 1:
+            part_outputs = [part["output_path"] for part in parts if os.path.exists(part["output_path"])]
+            concat_videos(part_outputs, output_path)
+            for part_output in part_outputs:
+                os.remove(part_output)
+
+    return tracks
+
+def joint_similarities(correct_landmarks, wrong_landmarks, joints=(DEFAULT_JOINT,), method=SIMILARITY_METHOD):
+    """
+    Similarity percentage of every joint's angle series between two landmark series.
+
+    Args:
+        correct_landmarks (np.ndarray): Landmarks of the correct technique video, see track_video
+        wrong_landmarks (np.ndarray): Landmarks of the wrong technique video
+        joints (iterable): Names of joints in joints.JOINTS
+        method (str): Similarity method, see similarity.compare_series
+
+    Returns:
+        dict: Joint name to similarity percentage
+    """
+    correct_angles = joint_angles(correct_landmarks, joints)
+    wrong_angles = joint_angles(wrong_landmarks, joints)
+    return {
+        joint: compare_series(correct_angles[joint], wrong_angles[joint], method=method)["similarity"]
+        for joint in correct_angles
+    }
+
+def analyze_arm_angles(correct_video_path, wrong_video_path, output_folder='temp', workers=None, segment_frames=None,
+                       stride=1, target_fps=None, max_side=None, outputs=OUTPUTS):
     """
     Analyze arm angles from correct and wrong technique videos and generate comparison visualizations
     
@@ -127,119 +454,150 @@ def analyze_arm_angles(correct_video_path, wrong_video_path, output_folder='temp
         correct_video_path (str): Path to the video with correct technique
         wrong_video_path (str): Path to the video with wrong technique
         output_folder (str): Path to folder where outputs will be saved
+        workers (int): Number of pose estimation processes, defaults to SPORT_ANALYSIS_WORKERS
+        segment_frames (int): Split videos longer than this many frames across workers
+        stride (int): Run pose estimation on every ``stride``-th frame only
+        target_fps (float): Sample frames at roughly this rate instead of a fixed stride
+        max_side (int): Downscale frames to at most this many pixels on the longest side
+        outputs (iterable): Artifacts to generate, any of OUTPUTS
     
     Returns:
-        dict: Dictionary containing paths to the generated videos and images and similarity percentage
+        dict: Dictionary containing paths to the generated videos and images (None for
+            outputs that were not requested) and similarity percentage
     """
+    outputs = validate_outputs(outputs)
     # Create output directory if it doesn't exist
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
     
-    # Create temporary directory for frames
-    temp_frames_path = os.path.join(output_folder, 'temp_frames')
-    if not os.path.exists(temp_frames_path):
-        os.makedirs(temp_frames_path)
-    
-    # Process both videos
-    print("Processing correct technique video...")
-    correct_angles, correct_pose_frames = process_video(correct_video_path)
-    
-    print("Processing wrong technique video...")
-    wrong_angles, wrong_pose_frames = process_video(wrong_video_path)
-    
-    # Calculate cosine similarity between the angle sequences
-    similarity = calculate_cosine_similarity(correct_angles, wrong_angles)
-    similarity_percentage = similarity * 100
-    print(f"Calculated similarity: {similarity_percentage:.2f}%")
-    
-    # Save the pose analysis videos
-    print("Creating pose analysis videos...")
-    correct_pose_output = os.path.join(output_folder, 'correct_pose_analysis.mp4')
-    wrong_pose_output = os.path.join(output_folder, 'wrong_pose_analysis.mp4')
-    
-    # Create video clips from pose frames
-    correct_pose_clip = ImageSequenceClip([frame for frame in correct_pose_frames], fps=15)
-    correct_pose_clip.write_videofile(correct_pose_output)
-    
-    wrong_pose_clip = ImageSequenceClip([frame for frame in wrong_pose_frames], fps=15)
-    wrong_pose_clip.write_videofile(wrong_pose_output)
-    
-    # Create frames for angle comparison animation
-    print("Creating angle comparison animation...")
-    max_frames = max(len(correct_angles), len(wrong_angles))
-    correct_times = list(range(len(correct_angles)))
-    wrong_times = list(range(len(wrong_angles)))
-    
-    # Set dark style for plots
-    plt.style.use('dark_background')
-    
-    for frame in range(max_frames):
-        plt.figure(figsize=(12, 6))
-        
-        # Plot correct technique data up to current frame
-        if frame < len(correct_angles):
-            plt.plot(correct_times[:frame+1], correct_angles[:frame+1], 
-                     color='#00ff00', linewidth=2, label='Correct Technique')
-        
-        # Plot wrong technique data up to current frame with dotted line
-        if frame < len(wrong_angles):
-            plt.plot(wrong_times[:frame+1], wrong_angles[:frame+1], 
-                     color='#ff3333', linestyle='--', linewidth=2, label='Wrong Technique')
-        
-        plt.xlim(0, max_frames)
-        plt.ylim(0, 180)
-        plt.xlabel('Frame Number', color='white')
-        plt.ylabel('Arm Angle (degrees)', color='white')
-        plt.title(f'Arm Angle Comparison\nSimilarity: {similarity_percentage:.2f}%', color='white', fontsize=14)
-        plt.grid(True, alpha=0.3)
-        plt.legend()
-        
-        # Save frame
-        frame_path = os.path.join(temp_frames_path, f'frame_{frame:04d}.png')
-        plt.savefig(frame_path, facecolor='black')
-        plt.close()
-    
-    # Create video from frames
-    frames = []
-    for frame in range(max_frames):
-        frame_path = os.path.join(temp_frames_path, f'frame_{frame:04d}.png')
-        frames.append(frame_path)
-    
-    # Create video clip
-    angle_comparison_output = os.path.join(output_folder, 'angle_comparison.mp4')
-    clip = ImageSequenceClip(frames, fps=15)
-    clip.write_videofile(angle_comparison_output)
-    
-    # Display final comparison graph
-    plt.figure(figsize=(12, 6))
-    plt.plot(correct_times, correct_angles, color='#00ff00', linewidth=2, label='Correct Technique')
-    plt.plot(wrong_times, wrong_angles, color='#ff3333', linestyle='--', linewidth=2, label='Wrong Technique')
-    plt.xlim(0, max_frames)
-    plt.ylim(0, 180)
-    plt.xlabel('Frame Number', color='white')
-    plt.ylabel('Arm Angle (degrees)', color='white')
-    plt.title(f'Final Arm Angle Comparison\nSimilarity: {similarity_percentage:.2f}%', color='white', fontsize=14)
-    plt.grid(True, alpha=0.3)
-    plt.legend()
+    correct_pose_output = wrong_pose_output = None
+    if "pose_videos" in outputs:
+        correct_pose_output = os.path.join(output_folder, 'correct_pose_analysis.mp4')
+        wrong_pose_output = os.path.join(output_folder, 'wrong_pose_analysis.mp4')
+
+    # Process both videos in parallel, streaming the pose analysis videos to disk
+    logger.info("Processing correct and wrong technique videos")
+    correct_track, wrong_track = process_videos(
+        [(correct_video_path, correct_pose_output), (wrong_video_path, wrong_pose_output)],
+        workers=workers,
+        segment_frames=segment_frames,
+        stride=stride,
+        target_fps=target_fps,
+        max_side=max_side
+    )
+    correct_angles, wrong_angles = correct_track["angles"], wrong_track["angles"]
     
-    # Save the final graph as an image
-    final_graph_output = os.path.join(output_folder, 'final_comparison_graph.png')
-    plt.savefig(final_graph_output, facecolor='black')
+    result = compare_arm_angles(correct_angles, wrong_angles, output_folder=output_folder, outputs=outputs)
+
+    return {
+        "correct_pose_video": correct_pose_output,
+        "wrong_pose_video": wrong_pose_output,
+        **result
+    }
+
+def compare_arm_angles(correct_angles, wrong_angles, output_folder='temp', method=SIMILARITY_METHOD, outputs=OUTPUTS):
+    """
+    Compare two arm angle series and generate the comparison visualizations
+
+    Args:
+        correct_angles (list): Arm angles of the correct technique video
+        wrong_angles (list): Arm angles of the wrong technique video
+        output_folder (str): Path to folder where outputs will be saved
+        method (str): Similarity method, see similarity.compare_series
+        outputs (iterable): Artifacts to generate; only ``angle_comparison_video``
+            and ``final_graph`` apply here
+
+    Returns:
+        dict: Dictionary containing paths to the comparison video and graph (None when
+            not requested), similarity percentage and ``alignment_path``, the matched
+            (correct, wrong) frame pairs
+    """
+    outputs = validate_outputs(outputs)
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    # Align the angle sequences and measure how similar the matched frames are
+    with timed("similarity", method=method):
+        comparison = compare_series(correct_angles, wrong_angles, method=method)
+    similarity_percentage = comparison["similarity"]
+    logger.info("Calculated similarity", extra={"similarity": round(similarity_percentage, 2)})
     
-    # Clean up temporary frames
-    for frame_path in frames:
-        os.remove(frame_path)
-    os.rmdir(temp_frames_path)
+    angle_comparison_output = final_graph_output = None
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # The final comparison graph is drawn while the animation renders and encodes
+        if "final_graph" in outputs:
+            final_graph_output = os.path.join(output_folder, 'final_comparison_graph.png')
+            final_graph = pool.submit(timed("plotting")(save_final_graph), correct_angles, wrong_angles,
+                                      similarity_percentage, final_graph_output, path=comparison["path"])
+
+        # Render the angle comparison animation straight into the encoder
+        if "angle_comparison_video" in outputs:
+            logger.info("Creating angle comparison animation")
+            angle_comparison_output = os.path.join(output_folder, 'angle_comparison.mp4')
+            with timed("encoding", output="angle_comparison_video"):
+                renderer = AngleComparisonRenderer(correct_angles, wrong_angles, similarity_percentage)
+                with VideoEncoder(angle_comparison_output, fps=15) as encoder:
+                    for frame in renderer.frames():
+                        encoder.write(frame)
+
+        if final_graph_output:
+            final_graph.result()
     
-    print("Analysis complete! All outputs saved to:", output_folder)
-    print(f"Movement similarity: {similarity_percentage:.2f}%")
+    logger.info("Analysis complete", extra={"output_folder": output_folder,
+                                            "similarity": round(similarity_percentage, 2)})
     
     return {
-        "correct_pose_video": correct_pose_output,
-        "wrong_pose_video": wrong_pose_output,
         "angle_comparison_video": angle_comparison_output,
         "final_graph": final_graph_output,
-        "similarity_percentage": similarity_percentage
+        "similarity_percentage": similarity_percentage,
+        "alignment_path": comparison["path"]
+    }
+
+def analyze_reps(correct_video_path, wrong_video_path, joint=DEFAULT_JOINT, method=SIMILARITY_METHOD, on_rep=None,
+                 **options):
+    """
+    Score every repetition in the wrong technique video against a typical
+    repetition of the correct one, while the wrong video is still being decoded.
+
+    The correct video is tracked first and its median-length rep becomes the
+    reference (see rep_analysis.reference_rep). The wrong video is then
+    streamed through a RepAnalyzer frame by frame, so each rep is reported to
+    ``on_rep`` as soon as it ends and memory does not grow with the length of
+    the session.
+
+    Both videos are compared at the frames that were actually sampled: with
+    ``stride`` or ``target_fps`` the reference is not interpolated back onto
+    every source frame, so the two series have the same timing, and the
+    segmentation settings of RepAnalyzer (smoothing, min_frames, max_frames)
+    count sampled frames.
+
+    Args:
+        correct_video_path (str): Path to the video with correct technique
+        wrong_video_path (str): Path to the video to score, e.g. a long training session
+        joint (str): Joint to measure, a name from joints.JOINTS
+        method (str): Similarity method, see similarity.compare_series
+        on_rep (callable): Called with every rep dictionary as soon as the rep completes
+        **options: track_video options (stride, target_fps, max_side, backend, complexity)
+
+    Returns:
+        dict: RepAnalyzer.summary of the wrong video, plus ``reference_frames``,
+            the length of the reference rep (None if the correct video has no complete rep)
+    """
+    reference_track = track_video(correct_video_path, interpolate=False, **options)
+    reference = reference_rep(joint_angles(reference_track["landmarks"], [joint])[joint],
+                              reference_track["frame_indices"])
+
+    cap = cv2.VideoCapture(wrong_video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or None
+    cap.release()
+
+    analyzer = RepAnalyzer(reference, joint=joint, method=method, fps=fps, on_rep=on_rep)
+    track_video(wrong_video_path, on_landmarks=analyzer.update_landmarks, keep_landmarks=False, **options)
+    analyzer.finish()
+
+    return {
+        **analyzer.summary(),
+        "reference_frames": None if reference is None else len(reference),
     }
 
 # # # Example usage:
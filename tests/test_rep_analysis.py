@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from rep_analysis import VALLEY, RepAnalyzer, segment_reps
+
+
+PERIOD = 60
+
+
+def sine(frames, period=PERIOD):
+    # Peaks at frames 15, 75, 135, ... and valleys half a period later
+    return 90 + 60 * np.sin(2 * np.pi * np.arange(frames) / period)
+
+
+def count_reps(angles, **options):
+    analyzer = RepAnalyzer(**options)
+    for frame_index, angle in enumerate(angles):
+        analyzer.update(frame_index, float(angle))
+    analyzer.finish()
+    return analyzer.reps
+
+
+def test_sine_counts_complete_reps_only():
+    # Ten peaks, so nine peak-to-peak reps; the series stops halfway up the tenth
+    reps = count_reps(sine(600))
+    assert len(reps) == 9
+    assert all(abs(rep["end_frame"] - rep["start_frame"] - PERIOD) <= 2 for rep in reps)
+
+
+def test_noisy_sine():
+    angles = sine(600) + np.random.default_rng(0).normal(0, 5, 600)
+    assert len(count_reps(angles)) == 9
+
+
+def test_finish_closes_a_rep_that_ends_at_its_turning_point():
+    # The last rep returns to the top and holds there, so no swing back ever confirms the peak
+    angles = np.concatenate([sine(556), np.full(30, sine(556)[-1])])
+    reps = count_reps(angles)
+    assert len(reps) == 9
+    assert reps[-1]["max_angle"] > 140
+
+
+def test_reps_between_valleys():
+    # Starts at a valley and ends a frame short of the eleventh, close enough to count
+    angles = 90 - 60 * np.cos(2 * np.pi * np.arange(600) / PERIOD)
+    reps = count_reps(angles, start=VALLEY)
+    assert len(reps) == 10
+    assert reps[-1]["end_frame"] == 599
+
+
+@pytest.mark.parametrize("angles", [
+    np.full(300, 90.0),
+    90 + np.random.default_rng(1).normal(0, 3, 300),
+])
+def test_no_reps_without_movement(angles):
+    assert count_reps(angles) == []
+
+
+def test_segment_reps_matches_online_analysis():
+    angles = sine(600) + np.random.default_rng(2).normal(0, 5, 600)
+    reps = count_reps(angles)
+    assert segment_reps(angles) == [(rep["start_frame"], rep["end_frame"]) for rep in reps]
+
+
+def pose_with_angles(angles):
+    """Landmarks whose default joint bends to each of ``angles`` (degrees)."""
+    from joints import DEFAULT_JOINT, JOINTS, NUM_LANDMARKS
+
+    shoulder, elbow, wrist = JOINTS[DEFAULT_JOINT]
+    radians = np.radians(angles)
+    landmarks = np.zeros((len(angles), NUM_LANDMARKS, 4), dtype=np.float32)
+    landmarks[:, elbow, :2] = 0.5
+    landmarks[:, shoulder, :2] = (0.5, 0.3)
+    landmarks[:, wrist, 0] = 0.5 + 0.2 * np.sin(radians)
+    landmarks[:, wrist, 1] = 0.5 - 0.2 * np.cos(radians)
+    return landmarks
+
+
+def test_analyze_reps_with_stride(monkeypatch):
+    sport_analysis = pytest.importorskip("sport_analysis")
+
+    def track_video(video_path, stride=1, interpolate=True, on_landmarks=None, keep_landmarks=True, **options):
+        # Like the real one: only sampled frames are streamed, and interpolation
+        # puts the returned track back onto every source frame
+        frame_indices = np.arange(0, 600, stride)
+        landmarks = pose_with_angles(sine(600)[frame_indices])
+        if on_landmarks is not None:
+            for frame_index, row in zip(frame_indices.tolist(), landmarks):
+                on_landmarks(frame_index, row)
+        if interpolate:
+            frame_indices = np.arange(600)
+            landmarks = pose_with_angles(sine(600))
+        if not keep_landmarks:
+            landmarks, frame_indices = landmarks[:0], frame_indices[:0]
+        return {"landmarks": landmarks, "frame_indices": frame_indices.tolist()}
+
+    monkeypatch.setattr(sport_analysis, "track_video", track_video)
+    result = sport_analysis.analyze_reps("correct.mp4", "wrong.mp4", stride=3)
+
+    assert result["count"] == 9
+    assert result["reference_frames"] == PERIOD // 3 + 1
+    assert all(rep["tempo_ratio"] == pytest.approx(1, abs=0.1) for rep in result["reps"])
+    assert result["similarity"] > 0.9
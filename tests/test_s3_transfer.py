@@ -0,0 +1,96 @@
+import json
+import math
+import os
+
+import pytest
+
+moto_server = pytest.importorskip("moto.server")
+
+import s3_transfer
+
+
+BUCKET = "videos"
+MB = 1024 * 1024
+
+
+@pytest.fixture(scope="module")
+def endpoint_url():
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def bucket(endpoint_url, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setattr(s3_transfer, "S3_ENDPOINT_URL", endpoint_url)
+    client = s3_transfer.get_s3_client(endpoint_url=endpoint_url)
+    client.create_bucket(Bucket=BUCKET)
+    # Videos are read back over plain HTTP, like from the public production bucket
+    client.put_bucket_policy(Bucket=BUCKET, Policy=json.dumps({
+        "Version": "2012-10-17",
+        "Statement": [{
+            "Effect": "Allow",
+            "Principal": "*",
+            "Action": "s3:GetObject",
+            "Resource": f"arn:aws:s3:::{BUCKET}/*",
+        }],
+    }))
+    return BUCKET
+
+
+@pytest.fixture
+def ranges(monkeypatch):
+    """Ranges fetched by download_file's parallel path."""
+    fetched = []
+    download_range = s3_transfer._download_range
+
+    def record(url, output_path, start, end):
+        fetched.append((start, end))
+        download_range(url, output_path, start, end)
+
+    monkeypatch.setattr(s3_transfer, "_download_range", record)
+    return fetched
+
+
+def upload_and_download(tmp_path, bucket, size):
+    data = os.urandom(size)
+    source = tmp_path / "source.mp4"
+    source.write_bytes(data)
+    url = s3_transfer.upload_file(str(source), bucket, "session.mp4")
+    output = s3_transfer.download_file(url, str(tmp_path / "downloaded" / "session.mp4"))
+    with open(output, "rb") as f:
+        return data, f.read()
+
+
+def test_large_file_uses_multipart_upload_and_ranged_download(tmp_path, bucket, ranges):
+    size = 2 * s3_transfer.MULTIPART_THRESHOLD + MB
+    parts = math.ceil(size / s3_transfer.PART_SIZE)
+    data, downloaded = upload_and_download(tmp_path, bucket, size)
+
+    client = s3_transfer.get_s3_client(endpoint_url=s3_transfer.S3_ENDPOINT_URL)
+    etag = client.head_object(Bucket=bucket, Key="session.mp4")["ETag"]
+    # Multipart uploads get an ETag of the form "<md5 of the part md5s>-<number of parts>"
+    assert etag.strip('"').endswith(f"-{parts}")
+    assert len(ranges) == parts
+    assert downloaded == data
+
+
+def test_small_file_is_streamed(tmp_path, bucket, ranges):
+    data, downloaded = upload_and_download(tmp_path, bucket, 3 * MB + 17)
+
+    assert ranges == []
+    assert downloaded == data
+
+
+def test_download_over_the_limit(tmp_path, bucket):
+    source = tmp_path / "source.mp4"
+    source.write_bytes(os.urandom(2 * MB))
+    url = s3_transfer.upload_file(str(source), bucket, "large.mp4")
+
+    with pytest.raises(s3_transfer.QuotaExceeded):
+        s3_transfer.download_file(url, str(tmp_path / "large.mp4"), max_bytes=MB)
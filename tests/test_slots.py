@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import slots
+from slots import SharedSlots
+
+
+@pytest.fixture(autouse=True)
+def slots_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(slots, "SLOTS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_try_acquire_returns_none_when_all_slots_are_taken():
+    shared = SharedSlots("test", 2)
+    first, second = shared.try_acquire(), shared.try_acquire()
+
+    assert first is not None and second is not None
+    assert shared.try_acquire() is None
+
+
+def test_release_frees_a_slot():
+    shared = SharedSlots("test", 1)
+    slot = shared.try_acquire()
+    assert shared.try_acquire() is None
+
+    SharedSlots.release(slot)
+    assert shared.try_acquire() is not None
+
+
+def test_slot_is_freed_when_its_holder_dies(slots_dir):
+    holder = subprocess.Popen(
+        [
+            sys.executable, "-c",
+            "import time; from slots import SharedSlots; "
+            f"slot = SharedSlots('test', 1, {str(slots_dir)!r}).acquire(); print('held', flush=True); time.sleep(60)",
+        ],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert holder.stdout.readline().strip() == "held"
+        assert SharedSlots("test", 1).try_acquire() is None
+    finally:
+        holder.kill()
+        holder.wait()
+
+    assert SharedSlots("test", 1).try_acquire() is not None
+
+
+def wait_for(progress, path):
+    while not os.path.exists(path):
+        time.sleep(0.05)
+
+
+def test_job_queue_rejects_jobs_beyond_its_capacity(tmp_path):
+    from jobs import InMemoryJobStore, JobQueue, QueueFull
+
+    release = tmp_path / "release"
+    queue = JobQueue(wait_for, InMemoryJobStore(), max_concurrent=1, max_queued=2, name="test")
+    try:
+        for _ in range(3):
+            queue.submit(path=str(release))
+        with pytest.raises(QueueFull):
+            queue.submit(path=str(release))
+    finally:
+        release.touch()
+        queue.shutdown()
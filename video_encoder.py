@@ -0,0 +1,152 @@
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+from moviepy.config import get_setting
+
+
+# Encoder settings, e.g. VIDEO_CODEC=h264_nvenc or h264_qsv for hardware encoding.
+# Without VIDEO_PRESET the codec's entry in DEFAULT_PRESETS is used; set it
+# to an empty string to pass no preset at all.
+VIDEO_CODEC = os.environ.get("VIDEO_CODEC", "libx264")
+VIDEO_PRESET = os.environ.get("VIDEO_PRESET")
+VIDEO_CRF = int(os.environ.get("VIDEO_CRF", 23))
+# ffmpeg encoder threads per video, 0 lets ffmpeg decide
+VIDEO_THREADS = int(os.environ.get("VIDEO_THREADS", 0))
+# Frames buffered between the caller and the ffmpeg pipe
+VIDEO_QUEUE_FRAMES = int(os.environ.get("VIDEO_QUEUE_FRAMES", 8))
+
+# Constant-quality option of every codec that has one
+QUALITY_OPTIONS = {
+    "libx264": "-crf",
+    "libx265": "-crf",
+    "libvpx-vp9": "-crf",
+    "h264_nvenc": "-cq",
+    "hevc_nvenc": "-cq",
+    "h264_qsv": "-global_quality",
+    "hevc_qsv": "-global_quality",
+}
+
+
+# Fast preset of every codec that takes one, in that codec's own naming
+DEFAULT_PRESETS = {
+    "libx264": "veryfast",
+    "libx265": "veryfast",
+    "h264_nvenc": "p2",
+    "hevc_nvenc": "p2",
+    "h264_qsv": "veryfast",
+    "hevc_qsv": "veryfast",
+}
+
+
+class VideoEncoder:
+    """
+    Incremental MP4 encoder.
+
+    Raw RGB frames are piped straight into an ffmpeg process as they are
+    written, so only a few frames are held in memory. The pipe is fed from a
+    background thread: write() returns once the frame is queued and the caller
+    keeps rendering or running inference while ffmpeg encodes. The frame size
+    is taken from the first frame; odd sizes are padded by one pixel because
+    yuv420p needs even dimensions.
+    """
+
+    def __init__(self, output_path, fps=15, codec=VIDEO_CODEC, preset=VIDEO_PRESET, crf=VIDEO_CRF,
+                 threads=VIDEO_THREADS, queue_frames=VIDEO_QUEUE_FRAMES):
+        self.output_path = output_path
+        self.fps = fps
+        self.codec = codec
+        self.preset = DEFAULT_PRESETS.get(codec) if preset is None else preset
+        self.crf = crf
+        self.threads = threads
+        self.frames_written = 0
+        self._queue = queue.Queue(maxsize=queue_frames)
+        self._process = None
+        self._thread = None
+        self._error = None
+
+    def command(self, width, height):
+        """ffmpeg command line for frames of the given size."""
+        command = [
+            get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(self.fps), "-i", "-",
+            "-an", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-c:v", self.codec,
+        ]
+        if self.preset:
+            command += ["-preset", self.preset]
+        if self.crf is not None and self.codec in QUALITY_OPTIONS:
+            command += [QUALITY_OPTIONS[self.codec], str(self.crf)]
+        if self.threads:
+            command += ["-threads", str(self.threads)]
+        return command + ["-pix_fmt", "yuv420p", "-movflags", "+faststart", self.output_path]
+
+    def write(self, frame):
+        """Encode one RGB frame (height x width x 3, uint8). The frame is copied, so the caller may reuse it."""
+        if self._error is not None:
+            raise self._error
+        if self._process is None:
+            height, width = frame.shape[:2]
+            self._process = subprocess.Popen(
+                self.command(width, height), stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            self._thread = threading.Thread(target=self._feed, daemon=True)
+            self._thread.start()
+        self._queue.put(frame.tobytes())
+        self.frames_written += 1
+
+    def close(self):
+        """
+        Wait for the video to be encoded.
+
+        Raises:
+            RuntimeError: If ffmpeg failed
+        """
+        if self._process is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._process.stdin.close()
+        stderr = self._process.stderr.read().decode(errors="replace").strip()
+        returncode = self._process.wait()
+        self._process = None
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to encode {self.output_path}: {stderr or returncode}")
+
+    def _feed(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            if self._error is not None:
+                # Keep draining so write() never blocks on a full queue
+                continue
+            try:
+                self._process.stdin.write(data)
+            except OSError as e:
+                self._error = RuntimeError(f"ffmpeg stopped accepting frames for {self.output_path}: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def concat_videos(input_paths, output_path):
+    """
+    Join MP4 files that share the same encoding settings into one, without re-encoding.
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        for path in input_paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+        list_path = f.name
+
+    try:
+        subprocess.run(
+            [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+             "-i", list_path, "-c", "copy", output_path],
+            check=True
+        )
+    finally:
+        os.remove(list_path)
@@ -0,0 +1,79 @@
+import logging
+import os
+import shutil
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+WORKSPACE_ROOT = os.environ.get("WORKSPACE_ROOT", "temp")
+# Disk space a single analysis may use, in megabytes
+WORKSPACE_QUOTA_MB = int(os.environ.get("WORKSPACE_QUOTA_MB", 4096))
+
+
+class QuotaExceeded(OSError):
+    """Raised when a workspace grows beyond its disk quota."""
+
+
+class Workspace:
+    """
+    Private scratch directory for one request.
+
+    Every workspace lives in its own uniquely named folder under ``root`` and
+    is removed with everything in it when the ``with`` block exits, so
+    concurrent analyses never see or delete each other's files.
+
+    Example:
+        with Workspace() as workspace:
+            path = workspace.file("input.mp4")
+    """
+
+    def __init__(self, root=WORKSPACE_ROOT, quota_bytes=WORKSPACE_QUOTA_MB * 1024 * 1024):
+        self.id = uuid.uuid4().hex
+        self.path = os.path.join(root, self.id)
+        self.quota_bytes = quota_bytes
+
+    def __enter__(self):
+        os.makedirs(self.path)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+
+    def file(self, name):
+        """Return the path of ``name`` inside the workspace."""
+        return os.path.join(self.path, name)
+
+    def key(self, name):
+        """Return a storage key for ``name`` that is unique to this workspace."""
+        return f"{self.id}/{name}"
+
+    def usage(self):
+        """Bytes currently used by the files in the workspace."""
+        total = 0
+        for folder, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(folder, filename))
+                except OSError:
+                    # File removed while walking
+                    pass
+        return total
+
+    def remaining(self):
+        """Bytes that can still be written before the quota is reached."""
+        if self.quota_bytes is None:
+            return None
+        return max(self.quota_bytes - self.usage(), 0)
+
+    def check_quota(self):
+        """
+        Raises:
+            QuotaExceeded: If the workspace uses more than its quota
+        """
+        if self.quota_bytes is not None and self.usage() > self.quota_bytes:
+            raise QuotaExceeded(f"Workspace {self.id} exceeded its quota of {self.quota_bytes} bytes")
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        logger.info("Removed workspace", extra={"workspace": self.path})